@@ -1,44 +1,29 @@
 from datetime import timedelta
 
-from django.http import JsonResponse
+from django.db import connection
+from django.db.models import Count, Q
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
-from customauth.token_utils import decrypt_and_decode_token
+from customauth.http_utils import authenticate_request, json_response, method_not_allowed
 from customauth.models import User
-from userprofile.models import HelperProfile, SeekerPreferences
+from userprofile.models import SeekerPreferences, Service
 
 
 # ---------- common helpers ----------
 
-def _get_bearer_token(request):
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
-
-
 def _require_admin(request):
     """
     Auth helper: require a valid token AND user_type == 'admin'.
     Returns (user, error_response or None).
     """
-    token = _get_bearer_token(request)
-    if not token:
-        return None, JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return None, JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
+    err = authenticate_request(request)
+    if err:
+        return None, err
 
+    user = request.auth_user
     if user.user_type != "admin":
-        return None, JsonResponse(
+        return None, json_response(
             {"detail": "Forbidden: admin access only", "user_type": user.user_type},
             status=403,
         )
@@ -64,7 +49,7 @@ def seekers_per_service_view(request):
     including slugs with 0 seekers.
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
     admin, err = _require_admin(request)
     if err:
@@ -76,21 +61,32 @@ def seekers_per_service_view(request):
     # Initialize all entries with 0
     per_service = {slug: 0 for slug in all_services}
 
-    # --- 2. Load all seeker preferences ---
-    prefs_qs = SeekerPreferences.objects.select_related("user").filter(
+    # --- 2. Count seekers that have preferences at all ---
+    total_seekers_with_prefs = SeekerPreferences.objects.filter(
         user__user_type="user"
-    )
-
-    total_seekers_with_prefs = prefs_qs.count()
+    ).count()
 
     # --- 3. Count how many seekers require each service ---
-    for prefs in prefs_qs:
-        for service_slug in prefs.required_services or []:
+    # unnest() + GROUP BY in Postgres, so only (slug, count) pairs come back
+    # instead of every SeekerPreferences row.
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT svc.slug, COUNT(*)
+            FROM {SeekerPreferences._meta.db_table} AS p
+            JOIN {User._meta.db_table} AS u ON u.id = p.user_id
+            CROSS JOIN LATERAL unnest(p.required_services) AS svc(slug)
+            WHERE u.user_type = %s
+            GROUP BY svc.slug
+            """,
+            ["user"],
+        )
+        for service_slug, count in cursor.fetchall():
             if service_slug in per_service:
-                per_service[service_slug] += 1
+                per_service[service_slug] = count
             # If unknown slugs appear in DB, we ignore them silently.
 
-    return JsonResponse(
+    return json_response(
         {
             "total_seekers_with_prefs": total_seekers_with_prefs,
             "per_service": per_service,
@@ -113,28 +109,24 @@ def summary_counts_view(request):
     }
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
     admin, err = _require_admin(request)
     if err:
         return err
 
-    total_helpers = User.objects.filter(user_type="helper").count()
-    total_seekers = User.objects.filter(user_type="user").count()
-    total_active_helpers = HelperProfile.objects.filter(
-        user__user_type="helper",
-        active=True,
-    ).count()
-
-    return JsonResponse(
-        {
-            "total_helpers": total_helpers,
-            "total_seekers": total_seekers,
-            "total_active_helpers": total_active_helpers,
-        },
-        status=200,
+    # One roundtrip: COUNT(*) FILTER (WHERE ...) for each figure.
+    counts = User.objects.aggregate(
+        total_helpers=Count("pk", filter=Q(user_type="helper")),
+        total_seekers=Count("pk", filter=Q(user_type="user")),
+        total_active_helpers=Count(
+            "helper_profile",
+            filter=Q(user_type="helper", helper_profile__active=True),
+        ),
     )
 
+    return json_response(counts, status=200)
+
 
 # ---------- 3. Registrations in last X days ----------
 
@@ -159,7 +151,7 @@ def registrations_stats_view(request):
     Assumes User has a 'created_at' DateTimeField (auto_now_add=True).
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
     admin, err = _require_admin(request)
     if err:
@@ -172,23 +164,19 @@ def registrations_stats_view(request):
     now = timezone.now()
     since = now - timedelta(days=days)
 
-    # filter by created_at >= since
-    recent_users = User.objects.filter(created_at__gte=since)
-
-    helpers = recent_users.filter(user_type="helper").count()
-    seekers = recent_users.filter(user_type="user").count()
-    total = recent_users.count()
+    # filter by created_at >= since, all three counts in one scan
+    counts = User.objects.filter(created_at__gte=since).aggregate(
+        helpers=Count("pk", filter=Q(user_type="helper")),
+        seekers=Count("pk", filter=Q(user_type="user")),
+        total=Count("pk"),
+    )
 
-    return JsonResponse(
+    return json_response(
         {
             "days": days,
             "from": since.isoformat(),
             "to": now.isoformat(),
-            "counts": {
-                "helpers": helpers,
-                "seekers": seekers,
-                "total": total,
-            },
+            "counts": counts,
         },
         status=200,
     )
@@ -63,6 +63,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'customauth.middleware.AuthTokenMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -105,6 +106,21 @@ CHANNEL_LAYERS = {
 }
 
 
+# Cache
+# Holds the decoded-token cache and its per-session revocation keys, the
+# response-cache generation and the Service catalog / known-values versions.
+# LocMem is per process, so none of those invalidations reach other
+# workers; with more than one worker set CACHE_BACKEND / CACHE_LOCATION to
+# a Redis or Memcached backend.
+CACHES = {
+    "default": {
+        # `or`: an empty CACHE_BACKEND= line in .env means the default
+        "BACKEND": os.getenv("CACHE_BACKEND")
+        or "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": os.getenv("CACHE_LOCATION") or "",
+    }
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -124,12 +140,31 @@ DATABASES = {
         "PASSWORD": os.getenv("DATABASE_PASSWORD"),
         "HOST": os.getenv("DATABASE_HOST", "127.0.0.1"),
         "PORT": os.getenv("DATABASE_PORT", "5432"),
-        "CONN_MAX_AGE": 60,  # connection pooling
+        # persistent connections; health-checked before reuse so a dropped
+        # connection (db restart, PgBouncer recycle) doesn't fail the request
+        "CONN_MAX_AGE": int(os.getenv("DATABASE_CONN_MAX_AGE") or 60),
+        "CONN_HEALTH_CHECKS": True,
+        # behind PgBouncer in transaction pooling mode: named cursors (used by
+        # QuerySet.iterator()) can't outlive a transaction, so turn them off
+        "DISABLE_SERVER_SIDE_CURSORS": (os.getenv("DATABASE_PGBOUNCER") or "").lower() == "true",
     }
 }
 
 
 
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# Argon2id for new hashes. The rest stay listed so existing PBKDF2 hashes
+# still verify; they are rehashed with Argon2 on the next successful login.
+
+PASSWORD_HASHERS = [
+    "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.ScryptPasswordHasher",
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -166,6 +201,22 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Search
+
+# pg_trgm word-similarity cut for fuzzy search (search_text %> q). Set per
+# query with SET LOCAL so the planner's GIN selectivity estimate matches
+# what is returned; the server default (0.6) drops most typo'd queries.
+SEARCH_WORD_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_WORD_SIMILARITY_THRESHOLD") or 0.3)
+
+# Uploaded media
+
+# When set (e.g. "/protected_uploads/"), profile pictures are handed to the
+# front proxy with X-Accel-Redirect instead of being streamed by Django.
+# Needs a matching internal location in nginx:
+#   location /protected_uploads/ { internal; alias <BASE_DIR>/baaisahab/uploads/; }
+# Empty (the default) keeps serving through FileResponse, e.g. for runserver.
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX") or ""
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -181,3 +232,6 @@ JWT_ACCESS_TOKEN_LIFETIME = datetime.timedelta(
     minutes=int(os.getenv("JWT_ACCESS_TOKEN_LIFETIME_MIN", "1440"))
 )
 JWT_ENCRYPTION_KEY = os.getenv("JWT_ENCRYPTION_KEY")
+# "fernet" (signed JWT inside Fernet) or "jwe" (compact JWE, dir + A256GCM).
+# Both formats are accepted when decoding.
+JWT_TOKEN_FORMAT = os.getenv("JWT_TOKEN_FORMAT") or "fernet"
@@ -1,16 +1,21 @@
-import json
 from urllib.parse import parse_qs
 
+import orjson
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 
-from customauth.token_utils import decrypt_and_decode_token
+from customauth.token_utils import decrypt_and_decode_token, get_cached_auth
 
 
-@database_sync_to_async
-def _auth_from_token(token: str):
+async def _auth_from_token(token: str):
     # returns (user, session, error)
-    return decrypt_and_decode_token(token)
+    # Cached tokens are answered on the event loop; only a miss pays the
+    # hop to the DB thread pool.
+    cached = get_cached_auth(token)
+    if cached is not None:
+        user, session = cached
+        return user, session, None
+    return await database_sync_to_async(decrypt_and_decode_token)(token)
 
 
 class ChatConsumer(AsyncWebsocketConsumer):
@@ -38,7 +43,7 @@ class ChatConsumer(AsyncWebsocketConsumer):
 
         # optional: send ack
         await self.send(
-            text_data=json.dumps({"type": "connection", "status": "ok"})
+            text_data=orjson.dumps({"type": "connection", "status": "ok"}).decode()
         )
 
     async def disconnect(self, close_code):
@@ -57,4 +62,4 @@ class ChatConsumer(AsyncWebsocketConsumer):
         """
         Handler for group_send(type="chat.message", message=payload)
         """
-        await self.send(text_data=json.dumps(event["message"]))
+        await self.send(text_data=orjson.dumps(event["message"]).decode())
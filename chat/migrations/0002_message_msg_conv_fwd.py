@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2025-12-09 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['from_user', 'to_user', 'time_sent'], name='msg_conv_fwd'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2025-12-09 13:05
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_msg_conv_fwd'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['attachments'], name='msg_attachments_gin'),
+        ),
+    ]
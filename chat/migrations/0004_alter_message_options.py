@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2025-12-09 13:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0003_message_msg_attachments_gin'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='message',
+            options={},
+        ),
+    ]
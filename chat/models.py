@@ -1,6 +1,7 @@
 from django.db import models
 from django.utils import timezone
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 
 from customauth.models import User
 
@@ -10,7 +11,8 @@ class Message(models.Model):
     Chat message between two users.
     Attachments stored as list of URL paths (strings).
     Physical files live under baaisahab/uploads/messageattachments/.
-    Filenames: <message_id>-<ordinal>.<ext>.
+    Filenames are content addressed: <sha256[:2]>/<sha256>.<ext>, so the
+    same file sent in many messages is stored once.
     """
 
     id = models.BigAutoField(primary_key=True)  # messageId
@@ -23,7 +25,7 @@ class Message(models.Model):
 
     content = models.TextField(blank=True)  # messageContents
 
-    # List of URL strings: ["/uploads/messageattachments/123-1.jpg", ...]
+    # List of URL strings: ["/uploads/messageattachments/ab/ab12...ef.jpg", ...]
     attachments = ArrayField(
         models.CharField(max_length=255),
         default=list,
@@ -39,7 +41,20 @@ class Message(models.Model):
     deleted_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        ordering = ["time_sent"]
+        # no default ordering: point lookups and UPDATEs should not carry an
+        # ORDER BY; list_messages_view orders by time_sent explicitly.
+        indexes = [
+            # conversation listing: (from_user, to_user) equality + time_sent
+            # order; both directions of a conversation hit this index.
+            # Partial, since deleted messages are never listed.
+            models.Index(
+                fields=["from_user", "to_user", "time_sent"],
+                condition=models.Q(is_deleted=False),
+                name="msg_conv_fwd",
+            ),
+            # secure-file permission check: attachments @> ARRAY[path]
+            GinIndex(fields=["attachments"], name="msg_attachments_gin"),
+        ]
 
     def mark_seen(self):
         if not self.is_seen:
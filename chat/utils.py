@@ -1,3 +1,5 @@
+import asyncio
+
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
@@ -30,20 +32,42 @@ def _message_to_dict(message: Message):
     }
 
 
+_channel_layer = None
+
+
+def _get_channel_layer():
+    # resolved once per process instead of on every broadcast
+    global _channel_layer
+    if _channel_layer is None:
+        _channel_layer = get_channel_layer()
+    return _channel_layer
+
+
+async def _group_send_all(channel_layer, group_names, event):
+    # one sync->async bridge for all groups, sends run concurrently
+    await asyncio.gather(
+        *(channel_layer.group_send(name, event) for name in group_names)
+    )
+
+
 def broadcast_message(message: Message, event_type: str = "message"):
     """
     Broadcast to all connections of sender + recipient.
     event_type: "message" | "edited" | "deleted" | "seen"
     """
-    channel_layer = get_channel_layer()
+    channel_layer = _get_channel_layer()
     payload = {
         "type": event_type,
         "message": _message_to_dict(message),
     }
 
-    for user_id in [message.from_user_id, message.to_user_id]:
-        group_name = f"user_{user_id}"
-        async_to_sync(channel_layer.group_send)(
-            group_name,
-            {"type": "chat.message", "message": payload},
-        )
+    # dict.fromkeys keeps order and collapses a message sent to oneself
+    group_names = [
+        f"user_{user_id}"
+        for user_id in dict.fromkeys([message.from_user_id, message.to_user_id])
+    ]
+    async_to_sync(_group_send_all)(
+        channel_layer,
+        group_names,
+        {"type": "chat.message", "message": payload},
+    )
@@ -1,13 +1,23 @@
-import json
+import functools
+import hashlib
+import mimetypes
 import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 
-from django.http import JsonResponse
+from django.core.files.move import file_move_safe
+from django.db.models import Count, Q, Window
+from django.http import FileResponse, HttpResponseNotFound
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.conf import settings
 
-from customauth.token_utils import decrypt_and_decode_token
+from customauth.http_utils import json_response, method_not_allowed, parse_json_body, require_auth
 from customauth.models import User
 from .models import Message
 from .utils import broadcast_message
@@ -17,60 +27,109 @@ MESSAGE_UPLOAD_DIR = os.path.join(
     settings.BASE_DIR, "baaisahab", "uploads", "messageattachments"
 )
 
+MESSAGE_UPLOAD_URL_PREFIX = "/uploads/messageattachments/"
 
-def _ensure_message_upload_dir():
-    os.makedirs(MESSAGE_UPLOAD_DIR, exist_ok=True)
+# Resolved once; secure-file paths are checked against it after realpath().
+UPLOADS_ROOT = os.path.realpath(os.path.join(settings.BASE_DIR, "baaisahab", "uploads"))
 
+ATTACHMENT_CHUNK_SIZE = 1024 * 1024
 
-def _get_bearer_token(request):
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
-
-
-def _require_auth(request):
-    token = _get_bearer_token(request)
-    if not token:
-        return None, JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
 
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return None, JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
+def _store_attachment(uploaded_file, ext):
+    """
+    Store one uploaded attachment under the SHA-256 of its bytes and return
+    its URL path: /uploads/messageattachments/<sha[:2]>/<sha><ext>.
 
-    return user, None
+    Identical files map to the same path, so a file that is already on disk
+    is not written again. New files go to a temp name in the target dir and
+    are renamed into place, so concurrent uploads of the same bytes never
+    expose a partial file.
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks(ATTACHMENT_CHUNK_SIZE):
+        digest.update(chunk)
+    sha = digest.hexdigest()
+
+    shard = sha[:2]
+    filename = sha + ext
+    url = MESSAGE_UPLOAD_URL_PREFIX + shard + "/" + filename
+    file_path = os.path.join(MESSAGE_UPLOAD_DIR, shard, filename)
+    if os.path.exists(file_path):
+        return url
+
+    shard_dir = os.path.dirname(file_path)
+    os.makedirs(shard_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=shard_dir, prefix=".upload-")
+    try:
+        if hasattr(uploaded_file, "temporary_file_path"):
+            # already spooled to disk by Django: move instead of copying
+            os.close(fd)
+            file_move_safe(
+                uploaded_file.temporary_file_path(), tmp_path, allow_overwrite=True
+            )
+        else:
+            uploaded_file.seek(0)
+            with os.fdopen(fd, "wb") as dest:
+                shutil.copyfileobj(uploaded_file.file, dest, length=ATTACHMENT_CHUNK_SIZE)
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return url
 
 
 def _message_to_dict(message: Message):
     return {
         "id": message.id,
-        "from_user": str(message.from_user_id),
-        "to_user": str(message.to_user_id),
+        "from_user": message.from_user_id,
+        "to_user": message.to_user_id,
         "content": message.content,
         "attachments": message.attachments,
         "is_seen": message.is_seen,
-        "time_sent": message.time_sent.isoformat() if message.time_sent else None,
-        "time_seen": message.time_seen.isoformat() if message.time_seen else None,
+        "time_sent": message.time_sent,
+        "time_seen": message.time_seen,
         "is_deleted": message.is_deleted,
-        "deleted_at": message.deleted_at.isoformat() if message.deleted_at else None,
+        "deleted_at": message.deleted_at,
     }
 
 
-def _parse_json_body(request):
-    if not request.body:
-        return {}
+def _parse_uuid(val):
     try:
-        return json.loads(request.body.decode("utf-8"))
-    except json.JSONDecodeError:
+        return uuid.UUID(str(val))
+    except (TypeError, ValueError):
         return None
 
 
+@functools.lru_cache(maxsize=8192)
+def _attachment_content_type(filename):
+    # names never change meaning, so the mimetypes lookup is memoized
+    content_type, _ = mimetypes.guess_type(filename)
+    return content_type or "application/octet-stream"
+
+
+def _update_message_returning(set_sql, where_sql, params):
+    """
+    Run a single UPDATE ... RETURNING on one message and return the updated
+    Message, or None when the WHERE clause matched nothing.
+
+    Ownership and state rules go into where_sql, so the check and the write
+    are one race-free statement; callers only look the row up again to pick
+    the right error when nothing matched.
+    """
+    rows = list(
+        Message.objects.raw(
+            f"UPDATE {Message._meta.db_table} SET {set_sql} "
+            f"WHERE {where_sql} RETURNING *",
+            params,
+        )
+    )
+    return rows[0] if rows else None
+
+
 # ---------- CREATE message ----------
 
 @csrf_exempt
@@ -91,68 +150,73 @@ def create_message_view(request):
     }
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)
+    user, err = require_auth(request)
     if err:
         return err
 
-    _ensure_message_upload_dir()
-
     to_user_id = None
     content = ""
+    is_multipart = request.content_type.startswith("multipart/form-data")
 
-    if request.content_type.startswith("multipart/form-data"):
-        to_user_id = request.POST.get("to_user_id")
-        content = request.POST.get("content") or ""
+    if is_multipart:
+        post = request.POST
+        to_user_id = post.get("to_user_id")
+        content = post.get("content") or ""
     else:
-        data = _parse_json_body(request)
+        data = parse_json_body(request)
         if data is None:
-            return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+            return json_response({"detail": "Invalid JSON body"}, status=400)
         to_user_id = data.get("to_user_id")
         content = data.get("content") or ""
 
     if not to_user_id:
-        return JsonResponse({"detail": "to_user_id is required"}, status=400)
+        return json_response({"detail": "to_user_id is required"}, status=400)
+
+    # EXISTS probe on the pk index instead of loading the whole User row;
+    # the parsed UUID is what gets stored, so the broadcast group name and
+    # the echoed to_user are canonical whatever spelling the client sent
+    to_uuid = _parse_uuid(to_user_id)
+    if to_uuid is None or not User.objects.filter(pk=to_uuid).exists():
+        return json_response({"detail": "Recipient user not found"}, status=404)
+
+    # Handle attachments from multipart (if any). Files are content
+    # addressed, so they are stored before the row exists and the message
+    # is inserted once with its final attachments list.
+    attachments_urls = []
+    files = []
+    if is_multipart:
+        files = request.FILES.getlist("attachments")
 
-    try:
-        to_user = User.objects.get(id=to_user_id)
-    except User.DoesNotExist:
-        return JsonResponse({"detail": "Recipient user not found"}, status=404)
+    if files:
+        # rfind instead of os.path.splitext; a leading dot (".env") is a
+        # name, not an extension, same as splitext
+        exts = []
+        for f in files:
+            name = f.name
+            dot = name.rfind(".")
+            exts.append(name[dot:].lower() if dot > 0 else "")
+
+        if len(files) == 1:
+            attachments_urls = [_store_attachment(files[0], exts[0])]
+        else:
+            # hashing and writes overlap (hashlib drops the GIL on large
+            # buffers); list() keeps order and re-raises the first failure
+            with ThreadPoolExecutor(max_workers=min(8, len(files))) as pool:
+                attachments_urls = list(pool.map(_store_attachment, files, exts))
 
-    # Create message first (attachments empty)
     message = Message.objects.create(
-        from_user=user,
-        to_user=to_user,
+        from_user_id=user.id,
+        to_user_id=to_uuid,
         content=content,
-        attachments=[],
+        attachments=attachments_urls,
     )
 
-    # Handle attachments from multipart (if any)
-    attachments_urls = []
-    if request.content_type.startswith("multipart/form-data"):
-        files = request.FILES.getlist("attachments")
-        for idx, f in enumerate(files, start=1):
-            _, ext = os.path.splitext(f.name)
-            ext = (ext or "").lower()
-            filename = f"{message.id}-{idx}{ext}"
-            file_path = os.path.join(MESSAGE_UPLOAD_DIR, filename)
-
-            with open(file_path, "wb+") as dest:
-                for chunk in f.chunks():
-                    dest.write(chunk)
-
-            rel_url = f"/uploads/messageattachments/{filename}"
-            attachments_urls.append(rel_url)
-
-    if attachments_urls:
-        message.attachments = attachments_urls
-        message.save(update_fields=["attachments"])
-
     # broadcast via WS
     broadcast_message(message, event_type="message")
 
-    return JsonResponse(_message_to_dict(message), status=201)
+    return json_response(_message_to_dict(message), status=201)
 
 
 # ---------- GET conversation messages ----------
@@ -166,25 +230,23 @@ def list_messages_view(request):
     Excludes deleted messages.
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)
+    user, err = require_auth(request)
     if err:
         return err
 
     other_id = request.GET.get("with_user")
     if not other_id:
-        return JsonResponse(
+        return json_response(
             {"detail": "with_user query parameter is required"},
             status=400,
         )
 
-    try:
-        _ = User.objects.get(id=other_id)
-    except User.DoesNotExist:
-        return JsonResponse({"detail": "Other user not found"}, status=404)
-
-    from django.db.models import Q
+    # No existence lookup for the other user: an unknown id simply yields
+    # an empty conversation. Only reject ids that cannot be a UUID.
+    if _parse_uuid(other_id) is None:
+        return json_response({"detail": "with_user must be a valid user id"}, status=400)
 
     page = int(request.GET.get("page", "1") or 1)
     page_size = int(request.GET.get("page_size", "20") or 20)
@@ -192,20 +254,27 @@ def list_messages_view(request):
         page_size = 100
 
     qs = Message.objects.filter(
+        Q(from_user=user, to_user_id=other_id)
+        | Q(from_user_id=other_id, to_user=user),
         is_deleted=False,
-        (
-            Q(from_user=user, to_user_id=other_id)
-            | Q(from_user_id=other_id, to_user=user)
-        ),
-    ).order_by("time_sent")
+    )
 
-    total = qs.count()
     start = (page - 1) * page_size
     end = start + page_size
 
-    messages = qs[start:end]
+    # COUNT(*) OVER () rides along with the page, so total and rows come
+    # back in a single query.
+    messages = list(
+        qs.annotate(total_count=Window(expression=Count("id")))
+        .order_by("time_sent")[start:end]
+    )
+    if messages:
+        total = messages[0].total_count
+    else:
+        # past the last page there is no row to carry the window count
+        total = qs.count() if start else 0
 
-    return JsonResponse(
+    return json_response(
         {
             "with_user": other_id,
             "pagination": {
@@ -232,44 +301,44 @@ def edit_message_view(request, message_id: int):
     - Only if NOT seen AND within 15 minutes of time_sent.
     """
     if request.method not in ("PATCH", "PUT"):
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)
+    user, err = require_auth(request)
     if err:
         return err
 
-    try:
-        message = Message.objects.get(id=message_id)
-    except Message.DoesNotExist:
-        return JsonResponse({"detail": "Message not found"}, status=404)
+    data = parse_json_body(request)
+    if data is None:
+        return json_response({"detail": "Invalid JSON body"}, status=400)
 
-    if message.from_user_id != user.id:
-        return JsonResponse({"detail": "Only sender can edit this message"}, status=403)
+    new_content = data.get("content")
+    if new_content is None:
+        return json_response({"detail": "content is required"}, status=400)
 
-    # rule: not seen AND within 15 mins
+    # rule: only sender, not seen AND within 15 mins
     now = timezone.now()
-    if message.is_seen or (now - message.time_sent) > timedelta(minutes=15):
-        return JsonResponse(
+    message = _update_message_returning(
+        "content = %s",
+        "id = %s AND from_user_id = %s AND is_seen = FALSE AND time_sent >= %s",
+        [new_content, message_id, user.id, now - timedelta(minutes=15)],
+    )
+
+    if message is None:
+        message = Message.objects.filter(id=message_id).first()
+        if message is None:
+            return json_response({"detail": "Message not found"}, status=404)
+        if message.from_user_id != user.id:
+            return json_response({"detail": "Only sender can edit this message"}, status=403)
+        return json_response(
             {
                 "detail": "Message can no longer be edited (either seen or too old)",
             },
             status=400,
         )
 
-    data = _parse_json_body(request)
-    if data is None:
-        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
-
-    new_content = data.get("content")
-    if new_content is None:
-        return JsonResponse({"detail": "content is required"}, status=400)
-
-    message.content = new_content
-    message.save(update_fields=["content"])
-
     broadcast_message(message, event_type="edited")
 
-    return JsonResponse(_message_to_dict(message), status=200)
+    return json_response(_message_to_dict(message), status=200)
 
 
 # ---------- DELETE message ----------
@@ -285,30 +354,36 @@ def delete_message_view(request, message_id: int):
     - Soft delete (is_deleted = True).
     """
     if request.method != "DELETE":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)
+    user, err = require_auth(request)
     if err:
         return err
 
-    try:
-        message = Message.objects.get(id=message_id)
-    except Message.DoesNotExist:
-        return JsonResponse({"detail": "Message not found"}, status=404)
+    message = _update_message_returning(
+        "is_deleted = TRUE, deleted_at = %s",
+        "id = %s AND from_user_id = %s AND is_seen = FALSE AND is_deleted = FALSE",
+        [timezone.now(), message_id, user.id],
+    )
 
-    if message.from_user_id != user.id:
-        return JsonResponse({"detail": "Only sender can delete this message"}, status=403)
+    if message is not None:
+        broadcast_message(message, event_type="deleted")
+    else:
+        message = Message.objects.filter(id=message_id).first()
+        if message is None:
+            return json_response({"detail": "Message not found"}, status=404)
 
-    if message.is_seen:
-        return JsonResponse(
-            {"detail": "Message cannot be deleted because it has been seen"},
-            status=400,
-        )
+        if message.from_user_id != user.id:
+            return json_response({"detail": "Only sender can delete this message"}, status=403)
 
-    message.soft_delete()
-    broadcast_message(message, event_type="deleted")
+        if message.is_seen:
+            return json_response(
+                {"detail": "Message cannot be deleted because it has been seen"},
+                status=400,
+            )
+        # already deleted: nothing changed, nothing to broadcast
 
-    return JsonResponse(
+    return json_response(
         {"detail": "Message deleted", "id": message.id},
         status=200,
     )
@@ -325,93 +400,106 @@ def mark_seen_view(request, message_id: int):
     - Only recipient can mark seen.
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)
+    user, err = require_auth(request)
     if err:
         return err
 
-    try:
-        message = Message.objects.get(id=message_id)
-    except Message.DoesNotExist:
-        return JsonResponse({"detail": "Message not found"}, status=404)
+    message = _update_message_returning(
+        "is_seen = TRUE, time_seen = %s",
+        "id = %s AND to_user_id = %s AND is_seen = FALSE",
+        [timezone.now(), message_id, user.id],
+    )
 
-    if message.to_user_id != user.id:
-        return JsonResponse(
-            {"detail": "Only recipient can mark message as seen"}, status=403
-        )
+    if message is not None:
+        broadcast_message(message, event_type="seen")
+    else:
+        message = Message.objects.filter(id=message_id).first()
+        if message is None:
+            return json_response({"detail": "Message not found"}, status=404)
 
-    message.mark_seen()
-    broadcast_message(message, event_type="seen")
+        if message.to_user_id != user.id:
+            return json_response(
+                {"detail": "Only recipient can mark message as seen"}, status=403
+            )
+        # already seen: nothing changed, nothing to broadcast
 
-    return JsonResponse(_message_to_dict(message), status=200)
+    return json_response(_message_to_dict(message), status=200)
 
 @csrf_exempt
 def get_secure_file_view(request):
     """
-    GET /chat/secure-file/?path=/uploads/messageattachments/123-1.png
+    GET /chat/secure-file/?path=/uploads/messageattachments/ab/ab12...ef.png
 
     - 'path' is exactly what is stored in message.attachments
-      (e.g. '/uploads/messageattachments/123-1.png')
+      (e.g. '/uploads/messageattachments/ab/ab12...ef.png')
     - Auth via Bearer token (same as other chat views)
-    - Only sender or recipient of the message can access the file
+    - Only sender or recipient of a message carrying the file can access it
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)
+    user, err = require_auth(request)
     if err:
         return err
 
     rel_url = request.GET.get("path")
     if not rel_url:
-        return JsonResponse({"detail": "Missing 'path' parameter"}, status=400)
+        return json_response({"detail": "Missing 'path' parameter"}, status=400)
 
     # Expect URLs starting with /uploads/
     uploads_prefix = "/uploads/"
     if not rel_url.startswith(uploads_prefix):
-        return JsonResponse({"detail": "Invalid path"}, status=400)
+        return json_response({"detail": "Invalid path"}, status=400)
 
     # Strip '/uploads/' to get path relative to uploads dir
-    # '/uploads/messageattachments/123-1.png' -> 'messageattachments/123-1.png'
+    # '/uploads/messageattachments/ab/ab12.png' -> 'messageattachments/ab/ab12.png'
     rel_path = rel_url[len(uploads_prefix):]
 
     # Basic traversal protection
     if ".." in rel_path or rel_path.startswith("/") or rel_path.startswith("\\"):
-        return JsonResponse({"detail": "Invalid path"}, status=400)
-
-    base_dir = os.path.join(settings.BASE_DIR, "baaisahab", "uploads")
-    abs_path = os.path.join(base_dir, rel_path)
-
-    # Ensure we are still under the uploads root
-    if not abs_path.startswith(base_dir):
-        return JsonResponse({"detail": "Invalid path"}, status=400)
-
-    if not os.path.exists(abs_path):
-        return HttpResponseNotFound("File not found")
-
-    # -------- PERMISSION CHECK: derive message id from filename --------
-    filename = os.path.basename(abs_path)
-    try:
-        # '123-1.png' -> '123'
-        msg_id_str = filename.split("-", 1)[0]
-        msg_id = int(msg_id_str)
-    except Exception:
-        return JsonResponse({"detail": "Invalid file naming format"}, status=400)
+        return json_response({"detail": "Invalid path"}, status=400)
+
+    abs_path = os.path.realpath(os.path.join(UPLOADS_ROOT, rel_path))
+
+    # Ensure we are still under the uploads root (symlinks resolved)
+    if os.path.commonpath([UPLOADS_ROOT, abs_path]) != UPLOADS_ROOT:
+        return json_response({"detail": "Invalid path"}, status=400)
+
+    # -------- PERMISSION CHECK: a message of this user carries the file --------
+    # Content-addressed files can be shared by many messages, so look the
+    # path up in attachments (GIN index) instead of deriving a message id.
+    # Checked before touching the disk: paths are content hashes, and a
+    # 404-vs-403 difference would tell anyone whether a file was uploaded.
+    allowed = Message.objects.filter(
+        Q(from_user_id=user.id) | Q(to_user_id=user.id),
+        attachments__contains=[rel_url],
+    ).exists()
+    if not allowed:
+        return json_response({"detail": "Forbidden"}, status=403)
 
     try:
-        message = Message.objects.get(id=msg_id)
-    except Message.DoesNotExist:
-        return JsonResponse({"detail": "Message not found"}, status=404)
+        st = os.stat(abs_path)
+    except OSError:
+        return HttpResponseNotFound("File not found")
 
-    # Only sender or recipient can access
-    if user.id not in (message.from_user_id, message.to_user_id):
-        return JsonResponse({"detail": "Forbidden"}, status=403)
+    content_type = _attachment_content_type(os.path.basename(abs_path))
 
     # -------------------------------------------------------------------
 
-    content_type, _ = mimetypes.guess_type(abs_path)
-    if content_type is None:
-        content_type = "application/octet-stream"
-
-    return FileResponse(open(abs_path, "rb"), content_type=content_type)
+    # Conditional GET: attachments never change once written, so a client
+    # holding the current ETag / Last-Modified gets a bodiless 304.
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(st.st_mtime)
+    )
+    if not_modified is not None:
+        return not_modified
+
+    # FileResponse hands the open file to wsgi.file_wrapper, which lets the
+    # server use sendfile(2) instead of copying through Python.
+    response = FileResponse(open(abs_path, "rb"), content_type=content_type)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(st.st_mtime)
+    return response
@@ -0,0 +1,128 @@
+"""
+Small HTTP helpers shared by the API views.
+"""
+import functools
+
+import orjson
+from django.http import HttpResponse
+
+from .token_utils import decrypt_and_decode_token
+
+AUTH_HEADER = "HTTP_AUTHORIZATION"
+
+# Fixed error bodies are encoded once; each call still gets a fresh
+# HttpResponse, since middleware may add headers to the one it returns.
+_METHOD_NOT_ALLOWED_BODY = orjson.dumps({"detail": "Method not allowed"})
+_MISSING_TOKEN_BODY = orjson.dumps(
+    {"detail": "Authorization header with Bearer token required"}
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _invalid_token_body(error):
+    # error is one of a fixed set of codes from decrypt_and_decode_token
+    return orjson.dumps({"detail": "Invalid or expired token", "error": error})
+
+
+@functools.lru_cache(maxsize=None)
+def _forbidden_body(user_type):
+    return orjson.dumps({"detail": "Forbidden: insufficient role", "user_type": user_type})
+
+
+def _prebaked_response(body, status):
+    return HttpResponse(body, status=status, content_type="application/json")
+
+
+def method_not_allowed():
+    return _prebaked_response(_METHOD_NOT_ALLOWED_BODY, 405)
+
+
+def get_bearer_token(request):
+    """
+    Extract token from Authorization: Bearer <token> header.
+    Returns None when the header is missing, not Bearer, or empty.
+    """
+    auth_header = request.META.get(AUTH_HEADER)
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    # servers already strip surrounding whitespace from header values
+    return auth_header[7:].rstrip() or None
+
+
+def requires_auth(view_func):
+    """
+    Mark a view as needing a Bearer token; AuthTokenMiddleware resolves the
+    token for marked views before they run. The attribute survives
+    @csrf_exempt, which copies the wrapped function's __dict__.
+    """
+    view_func.requires_auth = True
+    return view_func
+
+
+def authenticate_request(request):
+    """
+    Resolve the request's Bearer token once and attach the result as
+    request.auth_user / request.auth_session / request.auth_error.
+
+    Returns None when authenticated, else the 401 response to send.
+    Later calls on the same request reuse the stored result, so the
+    middleware and the view can both call it for the price of one decode.
+    """
+    if not hasattr(request, "auth_error"):
+        token = get_bearer_token(request)
+        if token:
+            user, session, error = decrypt_and_decode_token(token)
+        else:
+            user, session, error = None, None, "missing_token"
+        request.auth_user = user
+        request.auth_session = session
+        request.auth_error = error
+
+    error = request.auth_error
+    if error is None:
+        return None
+    if error == "missing_token":
+        return _prebaked_response(_MISSING_TOKEN_BODY, 401)
+    return _prebaked_response(_invalid_token_body(error), 401)
+
+
+def require_auth(request, allowed_types=None):
+    """
+    Authenticate the request and return (user, error_response).
+    allowed_types: optional set of user_type strings; other roles get 403.
+    """
+    err = authenticate_request(request)
+    if err:
+        return None, err
+
+    user = request.auth_user
+    if allowed_types is not None and user.user_type not in allowed_types:
+        return None, _prebaked_response(_forbidden_body(user.user_type), 403)
+
+    return user, None
+
+
+def parse_json_body(request):
+    """
+    Parse JSON body with orjson (reads the bytes directly, no decode step).
+    Return dict or None if invalid.
+    """
+    if not request.body:
+        return {}
+    try:
+        return orjson.loads(request.body)
+    except orjson.JSONDecodeError:
+        return None
+
+
+def json_response(data, status=200, default=None):
+    """
+    Drop-in for JsonResponse(data, status=...) serialized with orjson.
+    datetime / UUID values are encoded natively; `default` is orjson's
+    hook for any other type.
+    """
+    return HttpResponse(
+        orjson.dumps(data, default=default),
+        status=status,
+        content_type="application/json",
+    )
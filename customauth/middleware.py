@@ -0,0 +1,28 @@
+"""
+Bearer-token authentication for views marked with @requires_auth.
+"""
+from .http_utils import authenticate_request
+
+
+class AuthTokenMiddleware:
+    """
+    Decodes the Authorization header once per request, and only for views
+    marked with @requires_auth; everything else skips the header parse and
+    the token decode entirely.
+
+    The result is attached to the request (auth_user / auth_session /
+    auth_error). Views still call authenticate_request() after their own
+    method check, which returns the stored result, so 405 keeps priority
+    over 401 and views behave the same without the middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if getattr(view_func, "requires_auth", False):
+            authenticate_request(request)
+        return None
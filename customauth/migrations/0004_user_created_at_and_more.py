@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2025-12-09 10:14
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customauth', '0003_user_user_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['created_at', 'user_type'], name='customauth__created_e72a00_idx'),
+        ),
+    ]
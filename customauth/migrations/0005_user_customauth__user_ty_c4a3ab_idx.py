@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2025-12-09 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customauth', '0004_user_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['user_type'], name='customauth__user_ty_c4a3ab_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2025-12-09 13:40
+
+import django.contrib.postgres.functions
+from django.contrib.postgres.operations import CryptoExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customauth', '0005_user_customauth__user_ty_c4a3ab_idx'),
+    ]
+
+    operations = [
+        # gen_random_uuid() is built in from Postgres 13; pgcrypto provides
+        # it on older servers.
+        CryptoExtension(),
+        migrations.AlterField(
+            model_name='user',
+            name='id',
+            field=models.UUIDField(db_default=django.contrib.postgres.functions.RandomUUID(), editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='usersession',
+            name='id',
+            field=models.UUIDField(db_default=django.contrib.postgres.functions.RandomUUID(), editable=False, primary_key=True, serialize=False),
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.8 on 2025-12-10 10:15
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customauth', '0006_alter_user_id_alter_usersession_id'),
+    ]
+
+    operations = [
+        # pg_trgm, for userprofile's search_text trigram indexes
+        TrigramExtension(),
+    ]
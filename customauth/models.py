@@ -2,13 +2,17 @@
 import uuid
 from django.db import models
 from django.contrib.auth.hashers import make_password, check_password  # or use Django’s auth framework
+from django.contrib.postgres.functions import RandomUUID
+from django.contrib.postgres.indexes import OpClass
+from django.db.models.functions import Upper
 
 class User(models.Model):
     class UserType(models.TextChoices):
         ADMIN = "admin", "Admin"
         USER = "user", "User"
         HELPER = "helper", "Helper"
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # generated by Postgres (gen_random_uuid()) and read back via RETURNING
+    id = models.UUIDField(primary_key=True, db_default=RandomUUID(), editable=False)
     name = models.CharField(max_length=255)
     phone_number = models.CharField(max_length=20, unique=True)
     password = models.CharField(max_length=255)  # store hashed password, not plain text
@@ -17,13 +21,30 @@ class User(models.Model):
         choices=UserType.choices,
         default=UserType.USER,
     )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # admin stats / role filters: user_type equality
+            models.Index(fields=["user_type"]),
+            # registrations stats: created_at range scan + user_type filter
+            models.Index(fields=["created_at", "user_type"]),
+            # short search queries: user__name__istartswith
+            models.Index(OpClass(Upper("name"), name="text_pattern_ops"), name="user_name_upper_prefix"),
+        ]
 
     def set_password(self, raw_password):
         self.password = make_password(raw_password)
-        self.save()
+        # password only: no listing/search_text signal work for this save
+        self.save(update_fields=["password"])
 
     def check_password(self, raw_password):
-        return check_password(raw_password, self.password)
+        def setter(raw_password):
+            # hash was made with an older hasher/params: upgrade it in place
+            self.password = make_password(raw_password)
+            self.save(update_fields=["password"])
+
+        return check_password(raw_password, self.password, setter)
 
 class UserSession(models.Model):
     """
@@ -33,7 +54,7 @@ class UserSession(models.Model):
     - version_id: random UUID used inside the token
     - user: FK to User
     """
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)  # session id
+    id = models.UUIDField(primary_key=True, db_default=RandomUUID(), editable=False)  # session id
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sessions")
     version_id = models.UUIDField(default=uuid.uuid4, editable=False)  # random per session version
 
@@ -0,0 +1,92 @@
+"""
+Shared cache of decoded access tokens.
+
+Successful decodes live in django.core.cache (settings.CACHES), so every
+app and, with a shared backend, every worker hits the same entries:
+
+    tok:<blake2b-128 of token>  -> (session_gen, session)  # session.user joined in
+    tok:sess:<session id hex>   -> session_gen (random, one per session)
+
+Tokens are hashed before use as keys, so the bearer secret is never
+stored as a key. A hit skips Fernet/JWE, JWT parsing and the
+UserSession+User query. Revoking a session deletes its generation key,
+which orphans all cached tokens of that session at once. Entries live at
+most TOKEN_CACHE_TTL_SECONDS and never past the token's own exp.
+"""
+import hashlib
+import os
+import time
+import uuid
+
+from django.core.cache import cache
+
+TOKEN_CACHE_TTL_SECONDS = 60
+
+_TOKEN_KEY_PREFIX = "tok:"
+_SESSION_GEN_PREFIX = "tok:sess:"
+
+
+def _token_key(token: str) -> str:
+    # 128-bit BLAKE2b: collision-safe for cache keys and cheaper than SHA-256
+    return _TOKEN_KEY_PREFIX + hashlib.blake2b(
+        token.encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+def _session_gen_key(session_id) -> str:
+    # normalized, so payload ids (hex / dashed str) and model UUIDs share a key
+    if isinstance(session_id, uuid.UUID):
+        return _SESSION_GEN_PREFIX + session_id.hex
+    return _SESSION_GEN_PREFIX + str(session_id).replace("-", "")
+
+
+def get_session(token: str):
+    """
+    Cached session (with .user) for a token, or None on a miss or when the
+    session was revoked after the entry was written.
+    """
+    entry = cache.get(_token_key(token))
+    if entry is None:
+        return None
+    gen, session = entry
+    if cache.get(_session_gen_key(session.id)) != gen:
+        return None
+    return session
+
+
+def session_generation(session_id, timeout: int):
+    """
+    Current generation of a session, created on first use. Callers read it
+    before validating the session in the DB, so a revocation racing with a
+    decode still orphans the entry written after it.
+    """
+    key = _session_gen_key(session_id)
+    gen = cache.get(key)
+    if gen is None:
+        cache.add(key, os.urandom(8).hex(), timeout=timeout)
+        gen = cache.get(key)
+    return gen
+
+
+def set_session(token: str, gen, session, exp) -> None:
+    if gen is None:
+        return
+    timeout = TOKEN_CACHE_TTL_SECONDS
+    if exp is not None:
+        timeout = min(timeout, int(exp - time.time()))
+    if timeout > 0:
+        cache.set(_token_key(token), (gen, session), timeout=timeout)
+
+
+def invalidate(token: str) -> None:
+    """
+    Drop one token's entry.
+    """
+    cache.delete(_token_key(token))
+
+
+def invalidate_sessions(session_ids) -> None:
+    """
+    Orphan every cached token of the given sessions.
+    """
+    cache.delete_many([_session_gen_key(session_id) for session_id in session_ids])
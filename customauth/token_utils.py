@@ -1,23 +1,51 @@
-from datetime import datetime, timezone
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import time
+import uuid
 from typing import Optional, Tuple
 
 import jwt
+import orjson
+from cryptography.exceptions import InvalidTag
 from cryptography.fernet import Fernet, InvalidToken as FernetInvalidToken
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from django.conf import settings
+from django.core.exceptions import ValidationError
 
+from . import token_cache
 from .models import User, UserSession
 
+try:
+    # Optional Rust implementation of the same Fernet spec; several times
+    # faster than cryptography's on token-sized payloads.
+    import rfernet
+except ImportError:  # pragma: no cover - optional dependency
+    rfernet = None
 
-# -------- time helpers --------
 
-def _now() -> datetime:
-    return datetime.now(timezone.utc)
+# -------- time / id helpers --------
 
+def _uuid_hex(value) -> str:
+    """
+    32-char hex form of a UUID, for UUID objects as well as the dashed
+    strings found in older tokens; ids are compared in this form.
+    """
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    return str(value).replace("-", "")
 
+
+@functools.cache
 def _get_access_lifetime_seconds() -> int:
     """
     Uses settings.JWT_ACCESS_TOKEN_LIFETIME (a timedelta),
     wired from JWT_ACCESS_TOKEN_LIFETIME_MIN in .env.
+    Computed once per process.
     """
     lifetime = getattr(settings, "JWT_ACCESS_TOKEN_LIFETIME", None)
     if lifetime is None:
@@ -26,20 +54,50 @@ def _get_access_lifetime_seconds() -> int:
 
 
 # -------- crypto helpers --------
+# Settings are fixed for the life of the process, so the Fernet instance
+# (base64 key parsing + key split) and the JWT params are built once.
+# Misconfiguration still raises on every call: exceptions are not cached.
 
-def _get_fernet() -> Fernet:
+class _RFernet:
+    """
+    rfernet.Fernet behind the cryptography.fernet.Fernet interface used
+    here: encrypt(bytes) -> bytes, decrypt(bytes) -> bytes, and
+    FernetInvalidToken on any bad token. Tokens are interchangeable.
+    """
+
+    def __init__(self, key: str):
+        self._fernet = rfernet.Fernet(key)
+
+    def encrypt(self, data: bytes) -> bytes:
+        return self._fernet.encrypt(data).encode("ascii")
+
+    def decrypt(self, token: bytes) -> bytes:
+        try:
+            return self._fernet.decrypt(token.decode("ascii"))
+        except (rfernet.DecryptionError, UnicodeDecodeError) as exc:
+            raise FernetInvalidToken from exc
+
+
+@functools.cache
+def _get_fernet():
     """
     Build a Fernet instance from settings.JWT_ENCRYPTION_KEY.
     This must be a urlsafe base64-encoded 32-byte key.
+    Uses rfernet when it is installed, cryptography otherwise.
     """
     key = getattr(settings, "JWT_ENCRYPTION_KEY", None)
     if not key:
         raise RuntimeError("JWT_ENCRYPTION_KEY is not set in settings.")
+    if rfernet is not None:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        return _RFernet(key)
     if isinstance(key, str):
         key = key.encode("utf-8")
     return Fernet(key)
 
 
+@functools.cache
 def _get_jwt_params():
     secret = getattr(settings, "JWT_SECRET_KEY", None)
     alg = getattr(settings, "JWT_ALGORITHM", None)
@@ -52,6 +110,168 @@ def _get_jwt_params():
     return secret, alg
 
 
+# -------- raw JWT helpers --------
+# The payload shape is fixed, so HS256 tokens are assembled by hand
+# (orjson + one HMAC from a pre-keyed template) instead of going through
+# jwt.encode's generic header/JSON/algorithm dispatch. Other algorithms
+# still use PyJWT. The output is a standard JWT either way.
+
+# base64url('{"alg":"HS256","typ":"JWT"}'), byte-identical to PyJWT's header
+_JWT_HS256_HEADER = b"eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9"
+
+
+@functools.cache
+def _get_hs256_mac():
+    # keyed once; each token signs on a .copy() of this template
+    secret, _ = _get_jwt_params()
+    return hmac.new(secret.encode("utf-8"), digestmod=hashlib.sha256)
+
+
+def _encode_jwt(payload: dict) -> bytes:
+    secret, alg = _get_jwt_params()
+    if alg != "HS256":
+        token = jwt.encode(payload, secret, algorithm=alg)
+        return token.encode("ascii") if isinstance(token, str) else token
+
+    signing_input = (
+        _JWT_HS256_HEADER
+        + b"."
+        + base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=")
+    )
+    mac = _get_hs256_mac().copy()
+    mac.update(signing_input)
+    return signing_input + b"." + base64.urlsafe_b64encode(mac.digest()).rstrip(b"=")
+
+
+def _check_exp(payload) -> Tuple[Optional[dict], Optional[str]]:
+    # same rules as PyJWT: exp must be an int and lies in the future
+    exp = payload.get("exp") if isinstance(payload, dict) else None
+    if not isinstance(exp, int):
+        return None, "invalid_token"
+    if exp <= time.time():
+        return None, "token_expired"
+    return payload, None
+
+
+def _read_jwt_payload(token: bytes) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Payload of a JWT that came out of Fernet. Fernet's HMAC-SHA256 already
+    authenticated these bytes with our key, so the inner signature is not
+    verified again; only 'exp' is. Never call this on a JWT that did not
+    come through the Fernet layer.
+    """
+    parts = token.split(b".")
+    if len(parts) != 3:
+        return None, "invalid_token"
+    try:
+        payload = orjson.loads(_b64url_decode(parts[1].decode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        return None, "invalid_token"
+    return _check_exp(payload)
+
+
+# -------- JWE (dir + A256GCM) tokens --------
+# Opt-in with settings.JWT_TOKEN_FORMAT = "jwe". The payload is sealed in a
+# compact JWE with one AES-256-GCM pass (encrypt + authenticate) instead of
+# a signed JWT wrapped in Fernet (HMAC, then AES-CBC + HMAC). Decoding
+# accepts both formats, so flipping the setting logs nobody out.
+
+_JWE_HEADER = base64.urlsafe_b64encode(
+    b'{"alg":"dir","enc":"A256GCM"}'
+).rstrip(b"=")
+# header + empty "encrypted key" segment ("dir" uses the key as is);
+# Fernet tokens always start with "gAAAAA", so the formats cannot collide
+_JWE_PREFIX = _JWE_HEADER.decode("ascii") + ".."
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+@functools.cache
+def _use_jwe() -> bool:
+    return getattr(settings, "JWT_TOKEN_FORMAT", "fernet") == "jwe"
+
+
+@functools.cache
+def _get_jwe_aead() -> AESGCM:
+    """
+    AES-256-GCM key derived (HKDF-SHA256) from JWT_ENCRYPTION_KEY, so the
+    JWE format needs no extra secret.
+    """
+    key = getattr(settings, "JWT_ENCRYPTION_KEY", None)
+    if not key:
+        raise RuntimeError("JWT_ENCRYPTION_KEY is not set in settings.")
+    if isinstance(key, str):
+        key = key.encode("utf-8")
+    derived = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"baaisahab access token A256GCM",
+    ).derive(key)
+    return AESGCM(derived)
+
+
+def _encode_jwe(payload: dict) -> str:
+    iv = os.urandom(12)
+    sealed = _get_jwe_aead().encrypt(iv, orjson.dumps(payload), _JWE_HEADER)
+    # AESGCM appends the 16-byte tag; JWE carries it as its own segment
+    return (
+        _JWE_PREFIX
+        + _b64url_encode(iv)
+        + "."
+        + _b64url_encode(sealed[:-16])
+        + "."
+        + _b64url_encode(sealed[-16:])
+    )
+
+
+def _decode_jwe(token: str) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Decrypt a JWE access token and check 'exp'. The GCM tag already
+    authenticates the payload, so there is no separate signature.
+    Returns (payload, error_code) with the same codes as the Fernet path.
+    """
+    parts = token[len(_JWE_PREFIX):].split(".")
+    if len(parts) != 3:
+        return None, "invalid_encrypted"
+
+    try:
+        iv, ciphertext, tag = (_b64url_decode(part) for part in parts)
+        plaintext = _get_jwe_aead().decrypt(iv, ciphertext + tag, _JWE_HEADER)
+    except (InvalidTag, ValueError):
+        return None, "invalid_encrypted"
+
+    try:
+        payload = orjson.loads(plaintext)
+    except orjson.JSONDecodeError:
+        return None, "invalid_token"
+
+    return _check_exp(payload)
+
+
+# -------- decoded token cache --------
+# See token_cache.py; entries are shared by every app through django.core.cache.
+
+def get_cached_auth(encrypted_token: str) -> Optional[Tuple[User, UserSession]]:
+    """
+    Return (user, session) for an access token decoded recently, or None.
+    Only reads the cache, never the DB, so async code can call it directly
+    before falling back to decrypt_and_decode_token().
+    """
+    if not encrypted_token:
+        return None
+    session = token_cache.get_session(encrypted_token)
+    if session is None:
+        return None
+    return session.user, session
+
+
 # -------- session helpers (DB) --------
 
 def _create_session_row(user: User) -> UserSession:
@@ -74,34 +294,35 @@ def create_encrypted_access_token_for_session(session: UserSession) -> str:
     - type = "access"
     - iat, exp
 
+    With settings.JWT_TOKEN_FORMAT = "jwe" the payload is sealed as a
+    compact JWE (dir / A256GCM) instead.
+
     Returns opaque string suitable for:
         Authorization: Bearer <token>
     """
-    now = _now()
+    now_s = int(time.time())
     exp_seconds = _get_access_lifetime_seconds()
 
     user = session.user
 
+    # ids as .hex (32 chars, no dashes): smaller payload, less to encrypt
     payload = {
-        "user_id": str(user.id),
+        "user_id": _uuid_hex(user.id),
         "phone_number": user.phone_number,
         "user_type": user.user_type,
-        "session_id": str(session.id),
-        "session_version_id": str(session.version_id),
+        "session_id": _uuid_hex(session.id),
+        "session_version_id": _uuid_hex(session.version_id),
         "type": "access",
-        "iat": int(now.timestamp()),
-        "exp": int(now.timestamp() + exp_seconds),
+        "iat": now_s,
+        "exp": now_s + exp_seconds,
     }
 
-    secret, alg = _get_jwt_params()
-
-    token = jwt.encode(payload, secret, algorithm=alg)
-    if isinstance(token, bytes):
-        token = token.decode("utf-8")
+    if _use_jwe():
+        return _encode_jwe(payload)
 
     f = _get_fernet()
-    encrypted = f.encrypt(token.encode("utf-8"))
-    return encrypted.decode("utf-8")
+    encrypted = f.encrypt(_encode_jwt(payload))
+    return encrypted.decode("ascii")
 
 
 def create_session(user: User) -> Tuple[UserSession, str]:
@@ -127,21 +348,84 @@ def revoke_session(session: UserSession, hard_delete: bool = False) -> None:
 
     You can pick which one you want from your signout logic.
     """
+    token_cache.invalidate_sessions([session.id])
+
     if hard_delete:
         session.delete()
     else:
-        # uses the model helper if you defined rotate_version()
-        if hasattr(session, "rotate_version"):
-            session.rotate_version()
-        else:
-            # fallback: emulate rotate_version if method not present
-            import uuid
-            session.version_id = uuid.uuid4()
-            session.save(update_fields=["version_id", "updated_at"])
+        # the model owns version generation
+        session.rotate_version()
+
+
+def revoke_all_sessions_for_user(user: User) -> int:
+    """
+    Revoke every session of a user with a single DELETE
+    (their tokens get 'session_not_found').
+
+    Returns the number of sessions removed.
+    """
+    sessions = UserSession.objects.filter(user=user)
+    session_ids = list(sessions.values_list("id", flat=True))
+    if not session_ids:
+        return 0
+    token_cache.invalidate_sessions(session_ids)
+    # nothing references UserSession and no delete signals are connected,
+    # so Django issues one DELETE ... WHERE user_id = ... without loading rows
+    deleted, _ = sessions.delete()
+    return deleted
 
 
 # -------- token decode / validation --------
 
+# Fernet tokens: version byte 0x80 + 64-bit timestamp, base64url encoded,
+# always start with "gAAAAA". The shortest one (version 1 + timestamp 8 +
+# IV 16 + one AES block 16 + HMAC 32 = 73 bytes) is 100 base64 chars.
+_FERNET_TOKEN_PREFIX = "gAAAAA"
+_FERNET_MIN_TOKEN_LEN = 100
+
+# Only the columns request handlers read (the session timestamps are
+# echoed by logout). The user's password hash and created_at stay in the
+# DB (and out of the token cache) unless a view asks for them, in which
+# case Django loads the deferred field.
+_AUTH_SESSION_FIELDS = (
+    "id", "user_id", "version_id", "created_at", "updated_at",
+) + tuple(
+    f"user__{name}" for name in ("id", "name", "phone_number", "user_type")
+)
+
+
+def _decode_core(encrypted_token: str) -> Tuple[Optional[dict], Optional[str]]:
+    """
+    Decrypt + verify either token format and return (payload, error_code).
+    The single crypto path behind decrypt_and_decode_token and
+    decrypt_and_get_payload.
+    """
+    if not encrypted_token:
+        return None, "invalid_encrypted"
+
+    if encrypted_token.startswith(_JWE_PREFIX):
+        return _decode_jwe(encrypted_token)
+
+    # Cheap shape check before any crypto: probes and stale garbage are
+    # rejected without a base64 decode or HMAC.
+    if (
+        len(encrypted_token) < _FERNET_MIN_TOKEN_LEN
+        or not encrypted_token.startswith(_FERNET_TOKEN_PREFIX)
+    ):
+        return None, "invalid_encrypted"
+
+    # Decrypt the outer layer. Tokens are base64url, so the ASCII codec's
+    # fast path applies; non-ASCII input fails here as UnicodeEncodeError
+    # (a ValueError) and is reported as invalid_encrypted.
+    try:
+        f = _get_fernet()
+        decrypted_bytes = f.decrypt(encrypted_token.encode("ascii"))
+    except (FernetInvalidToken, ValueError, TypeError):
+        return None, "invalid_encrypted"
+
+    return _read_jwt_payload(decrypted_bytes)
+
+
 def decrypt_and_decode_token(
     encrypted_token: str,
     expected_type: str = "access",
@@ -150,39 +434,33 @@ def decrypt_and_decode_token(
     Decrypts the token, verifies the JWT, validates user + session,
     and returns (user, session, error_code).
 
+    Successful access-token results are cached (see token_cache) for a
+    short TTL, so repeat calls with the same token skip the crypto and
+    the DB lookups.
+
     error_code values:
     - None                       -> success
-    - "invalid_encrypted"        -> Fernet couldn't decrypt
+    - "invalid_encrypted"        -> Fernet / JWE couldn't decrypt
     - "token_expired"            -> JWT 'exp' check failed
     - "invalid_token"            -> bad JWT / bad signature
     - "invalid_type"             -> payload['type'] != expected_type
     - "user_id_missing"          -> no user_id in payload
     - "session_id_missing"       -> no session_id in payload
     - "session_not_found"        -> UserSession not in DB
-    - "user_not_found"           -> User not in DB
-    - "session_user_mismatch"    -> session.user != user
+    - "session_user_mismatch"    -> session.user_id != payload user_id
     - "session_version_mismatch" -> session.version_id != payload version
     """
     if not encrypted_token:
         return None, None, "invalid_encrypted"
 
-    # Decrypt the outer layer
-    try:
-        f = _get_fernet()
-        decrypted_bytes = f.decrypt(encrypted_token.encode("utf-8"))
-    except (FernetInvalidToken, ValueError, TypeError):
-        return None, None, "invalid_encrypted"
+    if expected_type == "access":
+        session = token_cache.get_session(encrypted_token)
+        if session is not None:
+            return session.user, session, None
 
-    decrypted = decrypted_bytes.decode("utf-8")
-    secret, alg = _get_jwt_params()
-
-    # Decode and verify JWT
-    try:
-        payload = jwt.decode(decrypted, secret, algorithms=[alg])
-    except jwt.ExpiredSignatureError:
-        return None, None, "token_expired"
-    except jwt.InvalidTokenError:
-        return None, None, "invalid_token"
+    payload, error = _decode_core(encrypted_token)
+    if error is not None:
+        return None, None, error
 
     # Type check (access / refresh etc.)
     if expected_type is not None:
@@ -190,35 +468,43 @@ def decrypt_and_decode_token(
         if token_type != expected_type:
             return None, None, "invalid_type"
 
-    # User
     user_id = payload.get("user_id")
     if not user_id:
         return None, None, "user_id_missing"
 
-    try:
-        user = User.objects.get(id=user_id)
-    except User.DoesNotExist:
-        return None, None, "user_not_found"
-
-    # Session
     session_id = payload.get("session_id")
     session_version_id = payload.get("session_version_id")
 
     if not session_id:
-        return user, None, "session_id_missing"
+        return None, None, "session_id_missing"
 
+    cache_gen = None
+    if expected_type == "access":
+        cache_gen = token_cache.session_generation(
+            session_id, timeout=_get_access_lifetime_seconds()
+        )
+
+    # Session and its user in one joined query; the payload's user_id is
+    # then cross-checked against the session's owner.
     try:
-        session = UserSession.objects.get(id=session_id)
-    except UserSession.DoesNotExist:
-        return user, None, "session_not_found"
+        session = (
+            UserSession.objects.select_related("user")
+            .only(*_AUTH_SESSION_FIELDS)
+            .get(id=session_id)
+        )
+    except (UserSession.DoesNotExist, ValueError, ValidationError):
+        return None, None, "session_not_found"
 
-    if session.user_id != user.id:
-        return user, None, "session_user_mismatch"
+    user = session.user
+    if _uuid_hex(user.id) != _uuid_hex(user_id):
+        return None, None, "session_user_mismatch"
 
-    if not session_version_id or str(session.version_id) != str(session_version_id):
+    if not session_version_id or _uuid_hex(session.version_id) != _uuid_hex(session_version_id):
         return user, session, "session_version_mismatch"
 
     # All good
+    if expected_type == "access":
+        token_cache.set_session(encrypted_token, cache_gen, session, payload.get("exp"))
     return user, session, None
 
 
@@ -230,27 +516,8 @@ def decrypt_and_get_payload(
 
     error_code values:
     - None                 -> success
-    - "invalid_encrypted"  -> Fernet couldn't decrypt
+    - "invalid_encrypted"  -> Fernet / JWE couldn't decrypt
     - "token_expired"      -> JWT 'exp' check failed
     - "invalid_token"      -> bad JWT / bad signature
     """
-    if not encrypted_token:
-        return None, "invalid_encrypted"
-
-    try:
-        f = _get_fernet()
-        decrypted_bytes = f.decrypt(encrypted_token.encode("utf-8"))
-    except (FernetInvalidToken, ValueError, TypeError):
-        return None, "invalid_encrypted"
-
-    decrypted = decrypted_bytes.decode("utf-8")
-    secret, alg = _get_jwt_params()
-
-    try:
-        payload = jwt.decode(decrypted, secret, algorithms=[alg])
-    except jwt.ExpiredSignatureError:
-        return None, "token_expired"
-    except jwt.InvalidTokenError:
-        return None, "invalid_token"
-
-    return payload, None
+    return _decode_core(encrypted_token)
@@ -1,69 +1,56 @@
-import json
-
-from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.db import IntegrityError
 
+from .http_utils import (
+    authenticate_request,
+    json_response,
+    method_not_allowed,
+    parse_json_body,
+    requires_auth,
+)
 from .models import User, UserSession
 from .token_utils import (
     create_session,
-    decrypt_and_decode_token,
     revoke_session,
+    revoke_all_sessions_for_user,
 )
 
 
 # ---------- small helpers ----------
 
-def _json_body(request):
+def _json_default(obj):
     """
-    Parse JSON body. Return dict or None if invalid.
+    orjson default= hook: User / UserSession objects are placed in response
+    data as-is and expanded here. The UUID / datetime values are left for
+    orjson to encode natively (same text as str() / isoformat()).
     """
-    if not request.body:
-        return {}
-    try:
-        return json.loads(request.body.decode("utf-8"))
-    except json.JSONDecodeError:
-        return None
-
-
-def _user_to_dict(user: User):
-    return {
-        "id": str(user.id),
-        "name": user.name,
-        "phone_number": user.phone_number,
-        "user_type": user.user_type,
-    }
-
-
-def _session_to_dict(session):
-    return {
-        "id": str(session.id),
-        "created_at": session.created_at.isoformat() if hasattr(session, "created_at") else None,
-        "updated_at": session.updated_at.isoformat() if hasattr(session, "updated_at") else None,
-    }
+    if isinstance(obj, User):
+        return {
+            "id": obj.id,
+            "name": obj.name,
+            "phone_number": obj.phone_number,
+            "user_type": obj.user_type,
+        }
+    if isinstance(obj, UserSession):
+        return {
+            "id": obj.id,
+            "created_at": obj.created_at,
+            "updated_at": obj.updated_at,
+        }
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
 
 
 def _auth_response(user, session, token: str):
     """
-    Unified shape for signup / signin response.
+    Unified shape for signup / signin response (serialize with _json_default).
     """
     return {
-        "user": _user_to_dict(user),
-        "session": _session_to_dict(session),
+        "user": user,
+        "session": session,
         "token": token,
     }
 
 
-def _get_bearer_token(request):
-    """
-    Extract token from Authorization: Bearer <token> header.
-    """
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
-
-
 # ---------- views ----------
 
 @csrf_exempt
@@ -80,11 +67,11 @@ def signup_view(request):
     }
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    data = _json_body(request)
+    data = parse_json_body(request)
     if data is None:
-        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+        return json_response({"detail": "Invalid JSON body"}, status=400)
 
     name = (data.get("name") or "").strip()
     phone_number = (data.get("phone_number") or "").strip()
@@ -94,13 +81,13 @@ def signup_view(request):
     # enforce allowed values
     allowed_types = {"user", "helper"}
     if user_type not in allowed_types:
-        return JsonResponse(
+        return json_response(
             {"detail": f"user_type must be one of {sorted(allowed_types)}"},
             status=400,
         )
 
     if not name or not phone_number or not password:
-        return JsonResponse(
+        return json_response(
             {"detail": "name, phone_number, and password are required"},
             status=400,
         )
@@ -115,13 +102,15 @@ def signup_view(request):
         user.save()
         user.set_password(password)
     except IntegrityError:
-        return JsonResponse(
+        return json_response(
             {"detail": "User with this phone_number already exists"},
             status=400,
         )
 
     session, token = create_session(user)
-    return JsonResponse(_auth_response(user, session, token), status=201)
+    return json_response(
+        _auth_response(user, session, token), status=201, default=_json_default
+    )
 
 
 @csrf_exempt
@@ -136,34 +125,40 @@ def signin_view(request):
     }
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    data = _json_body(request)
+    data = parse_json_body(request)
     if data is None:
-        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+        return json_response({"detail": "Invalid JSON body"}, status=400)
 
     phone_number = (data.get("phone_number") or "").strip()
     password = data.get("password") or ""
 
     if not phone_number or not password:
-        return JsonResponse(
+        return json_response(
             {"detail": "phone_number and password are required"},
             status=400,
         )
 
+    # phone_number is unique (indexed); load only what signin reads
     try:
-        user = User.objects.get(phone_number=phone_number)
+        user = User.objects.only(
+            "id", "name", "phone_number", "password", "user_type"
+        ).get(phone_number=phone_number)
     except User.DoesNotExist:
-        return JsonResponse({"detail": "Invalid credentials"}, status=400)
+        return json_response({"detail": "Invalid credentials"}, status=400)
 
     if not user.check_password(password):
-        return JsonResponse({"detail": "Invalid credentials"}, status=400)
+        return json_response({"detail": "Invalid credentials"}, status=400)
 
     session, token = create_session(user)
-    return JsonResponse(_auth_response(user, session, token), status=200)
+    return json_response(
+        _auth_response(user, session, token), status=200, default=_json_default
+    )
 
 
 @csrf_exempt
+@requires_auth
 def logout_view(request):
     """
     POST /auth/logout/
@@ -172,36 +167,28 @@ def logout_view(request):
     - Authorization: Bearer <token>
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    token = _get_bearer_token(request)
-    if not token:
-        return JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-
-    if error is not None or session is None:
-        return JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
+    err = authenticate_request(request)
+    if err:
+        return err
+    session = request.auth_session
 
     # Revoke this session only (this device)
     revoke_session(session, hard_delete=False)
 
-    return JsonResponse(
+    return json_response(
         {
             "detail": "Logged out successfully",
-            "session": _session_to_dict(session),
+            "session": session,
         },
         status=200,
+        default=_json_default,
     )
 
 
 @csrf_exempt
+@requires_auth
 def change_password_view(request):
     """
     POST /auth/change-password/
@@ -216,50 +203,42 @@ def change_password_view(request):
     }
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    token = _get_bearer_token(request)
-    if not token:
-        return JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
+    err = authenticate_request(request)
+    if err:
+        return err
+    user = request.auth_user
 
-    data = _json_body(request)
+    data = parse_json_body(request)
     if data is None:
-        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+        return json_response({"detail": "Invalid JSON body"}, status=400)
 
     old_password = data.get("old_password") or ""
     new_password = data.get("new_password") or ""
 
     if not old_password or not new_password:
-        return JsonResponse(
+        return json_response(
             {"detail": "old_password and new_password are required"},
             status=400,
         )
 
     if not user.check_password(old_password):
-        return JsonResponse(
+        return json_response(
             {"detail": "Old password is incorrect"},
             status=400,
         )
 
     user.set_password(new_password)
 
-    return JsonResponse(
+    return json_response(
         {"detail": "Password changed successfully"},
         status=200,
     )
 
 
 @csrf_exempt
+@requires_auth
 def revoke_all_sessions_view(request):
     """
     POST /auth/revoke-all-sessions/
@@ -278,45 +257,34 @@ def revoke_all_sessions_view(request):
       (including the one used in this request)
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    token = _get_bearer_token(request)
-    if not token:
-        return JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
+    err = authenticate_request(request)
+    if err:
+        return err
+    user = request.auth_user
 
-    data = _json_body(request)
+    data = parse_json_body(request)
     if data is None:
-        return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+        return json_response({"detail": "Invalid JSON body"}, status=400)
 
     password = data.get("password") or ""
     if not password:
-        return JsonResponse(
+        return json_response(
             {"detail": "password is required"},
             status=400,
         )
 
     if not user.check_password(password):
-        return JsonResponse(
+        return json_response(
             {"detail": "Password is incorrect"},
             status=400,
         )
 
     # Revoke all sessions for this user
-    sessions = UserSession.objects.filter(user=user)
-    for s in sessions:
-        revoke_session(s, hard_delete=True)
+    revoke_all_sessions_for_user(user)
 
-    return JsonResponse(
+    return json_response(
         {"detail": "All sessions revoked for this user"},
         status=200,
     )
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class FilterConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'filter'
+
+    def ready(self):
+        from .known_values import connect_signals
+
+        connect_signals()
@@ -0,0 +1,138 @@
+"""
+Values currently stored in the filterable array/choice columns, so a
+filter on a value no row holds can short-circuit to .none().
+
+    known:version -> random token, bumped after a commit that stores a
+                     value this process has not seen
+
+Each process keeps one {(model_name, field): frozenset} snapshot. It is
+built by a background thread, never on the request path:
+
+- on first use
+- after known:version moves
+- once the snapshot is KNOWN_VALUES_TTL_SECONDS old
+
+The TTL is what bounds staleness when the cache is per-process, because
+another process's bump is invisible then. known_values() returns None
+until a snapshot for the current version exists, and the caller then
+simply runs the real query.
+"""
+import os
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import F, Func
+from django.db.models.signals import post_save
+
+from userprofile.models import HelperProfile, SeekerPreferences
+
+KNOWN_VALUES_TTL_SECONDS = 300
+# debounce: refreshes start at most this often per process, so a failing
+# scan is not retried on every request
+KNOWN_VALUES_MIN_REFRESH_INTERVAL_SECONDS = 10
+
+# (field, is_array) per model
+TRACKED_FIELDS = {
+    HelperProfile: (("services", True), ("frequency_modes", True)),
+    SeekerPreferences: (("required_services", True), ("frequency", False)),
+}
+
+_VERSION_KEY = "known:version"
+
+# (version, monotonic load time, {(model_name, field): frozenset}),
+# swapped in whole so readers never see a half-built snapshot
+_snapshot = (None, 0.0, {})
+_refresh_lock = threading.Lock()
+_refreshing = False
+_last_refresh_start = None
+
+
+def version():
+    ver = cache.get(_VERSION_KEY)
+    if ver is None:
+        cache.add(_VERSION_KEY, os.urandom(8).hex(), timeout=None)
+        ver = cache.get(_VERSION_KEY)
+    return ver
+
+
+def bump_version() -> None:
+    cache.set(_VERSION_KEY, os.urandom(8).hex(), timeout=None)
+
+
+def _refresh():
+    global _snapshot, _refreshing
+    try:
+        # read before the scan: a bump during it leaves a mismatch behind,
+        # which schedules another refresh
+        ver = version()
+        values = {}
+        for model, fields in TRACKED_FIELDS.items():
+            for field, is_array in fields:
+                expr = Func(F(field), function="unnest") if is_array else F(field)
+                # lowercased: inputs are lowercased, and a wider set only
+                # means falling through to the real query
+                values[(model._meta.model_name, field)] = frozenset(
+                    v.lower()
+                    for v in model.objects.annotate(value=expr).values_list("value", flat=True).distinct()
+                    if v
+                )
+        _snapshot = (ver, time.monotonic(), values)
+    finally:
+        # this thread's own connection
+        connection.close()
+        _refreshing = False
+
+
+def _schedule_refresh():
+    # at most one refresh in flight per process, and not back to back
+    global _refreshing, _last_refresh_start
+    now = time.monotonic()
+    with _refresh_lock:
+        if _refreshing or (
+            _last_refresh_start is not None
+            and now - _last_refresh_start < KNOWN_VALUES_MIN_REFRESH_INTERVAL_SECONDS
+        ):
+            return
+        _refreshing = True
+        _last_refresh_start = now
+    threading.Thread(target=_refresh, name="known-values-refresh", daemon=True).start()
+
+
+def known_values(model, field):
+    """
+    frozenset of the (lowercased) values of `field` across all rows, or
+    None when this process has no snapshot for the current version yet.
+    """
+    ver, loaded_at, values = _snapshot
+    current = version()
+    if ver != current or time.monotonic() - loaded_at >= KNOWN_VALUES_TTL_SECONDS:
+        _schedule_refresh()
+    if ver != current:
+        return None
+    return values.get((model._meta.model_name, field))
+
+
+def _note_saved_values(sender, instance, update_fields=None, **kwargs):
+    # only a value missing from the snapshot can make it wrong; removed
+    # values just leave it wider than needed
+    values = _snapshot[2]
+    for field, is_array in TRACKED_FIELDS[sender]:
+        if update_fields is not None and field not in update_fields:
+            continue
+        stored = getattr(instance, field)
+        stored = (stored or []) if is_array else [stored]
+        known = values.get((sender._meta.model_name, field))
+        if known is None or not known.issuperset(v.lower() for v in stored if v):
+            # after commit, so the refresh this triggers sees the new row
+            transaction.on_commit(bump_version)
+            return
+
+
+def connect_signals():
+    for model in TRACKED_FIELDS:
+        post_save.connect(
+            _note_saved_values, sender=model,
+            dispatch_uid=f"known_values_save_{model.__name__}",
+        )
@@ -1,147 +1,40 @@
-from django.http import JsonResponse
+import orjson
+from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q
 
-from customauth.token_utils import decrypt_and_decode_token
-from userprofile.models import UserProfile, HelperProfile, SeekerPreferences
-
-
-# ---------- common helpers ----------
-
-def _get_bearer_token(request):
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
-
-
-def _require_auth(request, allowed_types=None):
-    """
-    Decode token, return (user, error_response).
-    allowed_types: set/list of user_type strings (e.g. {"user", "helper"}).
-    """
-    token = _get_bearer_token(request)
-    if not token:
-        return None, JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return None, JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
-
-    if allowed_types is not None and user.user_type not in allowed_types:
-        return None, JsonResponse(
-            {"detail": "Forbidden: insufficient role", "user_type": user.user_type},
-            status=403,
-        )
-
-    return user, None
-
-
-def _user_public_dict(user):
-    return {
-        "id": str(user.id),
-        "name": user.name,
-        "phone_number": user.phone_number,
-        "user_type": getattr(user, "user_type", None),
-    }
-
-
-def _profile_dict_or_none(profile: UserProfile | None):
-    if profile is None:
-        return None
-    return {
-        "id": str(profile.id),
-        "display_name": profile.display_name,
-        "avatar_url": profile.avatar_url,
-        "bio": profile.bio,
-        "created_at": profile.created_at.isoformat() if profile.created_at else None,
-        "updated_at": profile.updated_at.isoformat() if profile.updated_at else None,
-    }
-
-
-def _helper_profile_to_dict(hp: HelperProfile):
-    return {
-        "id": str(hp.id),
-        "services": hp.services,
-        "city": hp.city,
-        "area": hp.area,
-        "available_from": hp.available_from.isoformat(),
-        "available_to": hp.available_to.isoformat(),
-        "frequency_modes": hp.frequency_modes,
-        "experience_years": hp.experience_years,
-        "active": hp.active,
-        "created_at": hp.created_at.isoformat() if hp.created_at else None,
-        "updated_at": hp.updated_at.isoformat() if hp.updated_at else None,
-    }
-
-
-def _seeker_prefs_to_dict(prefs: SeekerPreferences):
-    return {
-        "id": str(prefs.id),
-        "required_services": prefs.required_services,
-        "city": prefs.city,
-        "area": prefs.area,
-        "from_time": prefs.from_time.isoformat(),
-        "to_time": prefs.to_time.isoformat(),
-        "frequency": prefs.frequency,
-        "created_at": prefs.created_at.isoformat() if prefs.created_at else None,
-        "updated_at": prefs.updated_at.isoformat() if prefs.updated_at else None,
-    }
-
-
-def _parse_bool_param(val: str | None):
-    if val is None:
-        return None
-    v = val.strip().lower()
-    if v in ("1", "true", "yes", "y", "on"):
-        return True
-    if v in ("0", "false", "no", "n", "off"):
+from customauth.http_utils import method_not_allowed, require_auth, requires_auth
+from userprofile import response_cache
+from userprofile.models import HelperProfile, SeekerPreferences
+from userprofile.utils import (
+    HELPER_PROFILE_FIELDS,
+    SEEKER_PREFS_FIELDS,
+    parse_bool_param,
+    parse_int_param,
+    parse_list_param,
+    parse_time_param,
+    profile_row_or_none,
+    row_fields,
+    split_helper_profile,
+    split_seeker_prefs,
+    split_user,
+)
+
+from .known_values import known_values
+
+
+def _has_unknown(values, model, field):
+    # a value no row holds can never satisfy an exact/contains filter;
+    # without a snapshot yet, just run the real query
+    if not values:
         return False
-    return None
-
-
-def _parse_int_param(val: str | None):
-    if val is None or val.strip() == "":
-        return None
-    try:
-        return int(val)
-    except ValueError:
-        return None
-
-
-def _parse_time_param(val: str | None):
-    """
-    Expect "HH:MM". Return datetime.time or None.
-    """
-    if not val:
-        return None
-    from datetime import time
-    try:
-        hour, minute = map(int, val.split(":"))
-        return time(hour, minute)
-    except Exception:
-        return None
-
-
-def _parse_list_param(val: str | None):
-    """
-    Parse comma-separated string into lowercase-trimmed list.
-    "cooking, cleaning" -> ["cooking","cleaning"]
-    """
-    if not val:
-        return []
-    return [p.strip().lower() for p in val.split(",") if p.strip()]
+    known = known_values(model, field)
+    return known is not None and not known.issuperset(values)
 
 
 # ---------- 1. Filter HELPERS ----------
 
 @csrf_exempt
+@requires_auth
 def filter_helpers_view(request):
     """
     GET /filter/helpers/?city=Kolkata&services=cooking,cleaning&frequency=monthly&from_time=09:00&to_time=15:00&min_experience=2&active=true
@@ -161,12 +54,17 @@ def filter_helpers_view(request):
       - active: true/false (default: true if omitted)
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, error_response = _require_auth(request, allowed_types={"user", "helper", "admin"})
+    user, error_response = require_auth(request, allowed_types={"user", "helper", "admin"})
     if error_response:
         return error_response
 
+    # output depends only on the query params; see userprofile.response_cache
+    cache_key, body = response_cache.lookup("filter:helpers", request.GET)
+    if body is not None:
+        return HttpResponse(body, content_type="application/json")
+
     city = request.GET.get("city")
     area = request.GET.get("area")
     services_param = request.GET.get("services")
@@ -176,13 +74,18 @@ def filter_helpers_view(request):
     min_experience_param = request.GET.get("min_experience")
     active_param = request.GET.get("active")
 
-    services = _parse_list_param(services_param)
-    from_time = _parse_time_param(from_time_param)
-    to_time = _parse_time_param(to_time_param)
-    min_experience = _parse_int_param(min_experience_param)
-    active = _parse_bool_param(active_param)
+    services = parse_list_param(services_param)
+    from_time = parse_time_param(from_time_param)
+    to_time = parse_time_param(to_time_param)
+    min_experience = parse_int_param(min_experience_param)
+    active = parse_bool_param(active_param)
 
-    qs = HelperProfile.objects.filter(user__user_type="helper").select_related("user")
+    qs = HelperProfile.objects.filter(user__user_type="helper")
+    if _has_unknown(services, HelperProfile, "services") or (
+        frequency and _has_unknown([frequency.strip().lower()], HelperProfile, "frequency_modes")
+    ):
+        # obviously empty: .none() never reaches the database
+        qs = qs.none()
 
     # default active=true if not provided
     if active is None:
@@ -215,25 +118,19 @@ def filter_helpers_view(request):
     if min_experience is not None:
         qs = qs.filter(experience_years__gte=min_experience)
 
-    qs = qs[:50]
-
-    results = []
-    for hp in qs:
-        helper_user = hp.user
-        try:
-            profile_obj = helper_user.profile
-        except UserProfile.DoesNotExist:
-            profile_obj = None
-
-        results.append(
-            {
-                "helper": _user_public_dict(helper_user),
-                "profile": _profile_dict_or_none(profile_obj),
-                "helper_profile": _helper_profile_to_dict(hp),
-            }
-        )
+    # LIMIT stays in SQL; iterator() skips the queryset result cache
+    rows = qs.values(*row_fields(HELPER_PROFILE_FIELDS, with_profile=True))[:50].iterator(chunk_size=50)
 
-    return JsonResponse(
+    results = [
+        {
+            "helper": split_user(row),
+            "profile": profile_row_or_none(row),
+            "helper_profile": split_helper_profile(row),
+        }
+        for row in rows
+    ]
+
+    body = orjson.dumps(
         {
             "filters": {
                 "city": city,
@@ -246,14 +143,16 @@ def filter_helpers_view(request):
                 "active": active if active is not None else True,
             },
             "results": results,
-        },
-        status=200,
+        }
     )
+    response_cache.store(cache_key, body)
+    return HttpResponse(body, content_type="application/json")
 
 
 # ---------- 2. Filter SEEKERS ----------
 
 @csrf_exempt
+@requires_auth
 def filter_seekers_view(request):
     """
     GET /filter/seekers/?city=Kolkata&services=cooking,cleaning&frequency=monthly&from_time=09:00&to_time=15:00
@@ -271,12 +170,17 @@ def filter_seekers_view(request):
       - from_time / to_time: seeker window must be inside provided window (or intersect, depending on taste)
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, error_response = _require_auth(request, allowed_types={"helper", "admin", "user"})
+    user, error_response = require_auth(request, allowed_types={"helper", "admin", "user"})
     if error_response:
         return error_response
 
+    # output depends only on the query params; see userprofile.response_cache
+    cache_key, body = response_cache.lookup("filter:seekers", request.GET)
+    if body is not None:
+        return HttpResponse(body, content_type="application/json")
+
     city = request.GET.get("city")
     area = request.GET.get("area")
     services_param = request.GET.get("services")
@@ -284,11 +188,17 @@ def filter_seekers_view(request):
     from_time_param = request.GET.get("from_time")
     to_time_param = request.GET.get("to_time")
 
-    services = _parse_list_param(services_param)
-    from_time = _parse_time_param(from_time_param)
-    to_time = _parse_time_param(to_time_param)
+    services = parse_list_param(services_param)
+    from_time = parse_time_param(from_time_param)
+    to_time = parse_time_param(to_time_param)
 
-    qs = SeekerPreferences.objects.filter(user__user_type="user").select_related("user")
+    qs = SeekerPreferences.objects.filter(user__user_type="user")
+    if _has_unknown(services, SeekerPreferences, "required_services") or (
+        frequency
+        and _has_unknown([frequency.strip().lower()], SeekerPreferences, "frequency")
+    ):
+        # obviously empty: .none() never reaches the database
+        qs = qs.none()
 
     if city:
         qs = qs.filter(city__iexact=city.strip())
@@ -309,25 +219,19 @@ def filter_seekers_view(request):
     elif to_time:
         qs = qs.filter(to_time__lte=to_time)
 
-    qs = qs[:50]
-
-    results = []
-    for prefs in qs:
-        seeker_user = prefs.user
-        try:
-            profile_obj = seeker_user.profile
-        except UserProfile.DoesNotExist:
-            profile_obj = None
-
-        results.append(
-            {
-                "seeker": _user_public_dict(seeker_user),
-                "profile": _profile_dict_or_none(profile_obj),
-                "seeker_preferences": _seeker_prefs_to_dict(prefs),
-            }
-        )
+    # LIMIT stays in SQL; iterator() skips the queryset result cache
+    rows = qs.values(*row_fields(SEEKER_PREFS_FIELDS, with_profile=True))[:50].iterator(chunk_size=50)
 
-    return JsonResponse(
+    results = [
+        {
+            "seeker": split_user(row),
+            "profile": profile_row_or_none(row),
+            "seeker_preferences": split_seeker_prefs(row),
+        }
+        for row in rows
+    ]
+
+    body = orjson.dumps(
         {
             "filters": {
                 "city": city,
@@ -338,6 +242,7 @@ def filter_seekers_view(request):
                 "to_time": to_time_param,
             },
             "results": results,
-        },
-        status=200,
+        }
     )
+    response_cache.store(cache_key, body)
+    return HttpResponse(body, content_type="application/json")
@@ -1,20 +1,38 @@
-from django.http import JsonResponse
+import threading
+import time
+
 from django.db import connection
-from datetime import datetime, timezone
+
+from customauth.http_utils import json_response
+
+# Probes arriving within this window reuse the last SELECT 1 result
+# instead of taking a DB connection each.
+DB_CHECK_TTL_SECONDS = 2.0
+
+_db_check_lock = threading.Lock()
+_last_db_check = [float("-inf"), False]  # [monotonic time, reachable]
+
+
+def _db_reachable():
+    with _db_check_lock:
+        now = time.monotonic()
+        if now - _last_db_check[0] > DB_CHECK_TTL_SECONDS:
+            # is_usable() pings on the raw driver connection, skipping
+            # Django's cursor wrapper and query bookkeeping
+            connection.ensure_connection()
+            _last_db_check[:] = [now, connection.is_usable()]
+        return _last_db_check[1]
 
 
 def health_view(request):
     # Simple DB health check
-    with connection.cursor() as cursor:
-        cursor.execute("SELECT 1;")
-        row = cursor.fetchone()
-
-    return JsonResponse(
+    return json_response(
         {
             "ok": True,
             "db": {
-                "reachable": row == (1,),
+                "reachable": _db_reachable(),
             },
-            "timestamp": int(datetime.now(timezone.utc).timestamp() * 1000)
+            # epoch millis straight from the clock, no datetime/tz object
+            "timestamp": time.time_ns() // 1_000_000,
         }
     )
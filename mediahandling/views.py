@@ -1,11 +1,15 @@
 import os
 import mimetypes
+import shutil
+import tempfile
 
 from django.conf import settings
-from django.http import JsonResponse, FileResponse, HttpResponseNotFound
+from django.http import FileResponse, HttpResponse, HttpResponseNotFound
 from django.views.decorators.csrf import csrf_exempt
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 
-from customauth.token_utils import decrypt_and_decode_token
+from customauth.http_utils import json_response, method_not_allowed, require_auth, requires_auth
 from userprofile.models import UserProfile
 
 
@@ -14,41 +18,65 @@ UPLOAD_BASE = os.path.join(settings.BASE_DIR, "baaisahab", "uploads")
 PROFILE_PIC_DIR = os.path.join(UPLOAD_BASE, "profile_pictures")
 
 
-def _ensure_profile_pic_dir():
-    os.makedirs(PROFILE_PIC_DIR, exist_ok=True)
+PROFILE_PIC_COPY_BUFFER = 1024 * 1024
 
+# Pictures live at a stable per-user URL, so a re-upload can show up to an
+# hour late in caches that already hold the old one.
+PROFILE_PIC_CACHE_CONTROL = "public, max-age=3600"
 
-def _get_bearer_token(request):
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
+# leading magic bytes -> stored extension (WEBP is checked separately,
+# its tag sits at offset 8 after the RIFF size field)
+_IMAGE_MAGIC = (
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+_ALLOWED_IMAGE_TYPES = ["gif", "jpeg", "png", "webp"]
 
 
-def _require_auth(request):
-    """
-    Decode token and return (user, error_response).
-    """
-    token = _get_bearer_token(request)
-    if not token:
-        return None, JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    from customauth.token_utils import decrypt_and_decode_token
+def _ensure_profile_pic_dir():
+    os.makedirs(PROFILE_PIC_DIR, exist_ok=True)
 
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return None, JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
 
-    return user, None
+def _sniff_image_ext(uploaded_file):
+    """
+    Extension for the upload's real image type, from its first 12 bytes,
+    or None if it is not one of the allowed formats.
+    """
+    uploaded_file.seek(0)
+    head = uploaded_file.read(12)
+    uploaded_file.seek(0)
+    for magic, ext in _IMAGE_MAGIC:
+        if head.startswith(magic):
+            return ext
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def _write_upload_atomically(uploaded_file, file_path):
+    """
+    Copy the upload to a temp file next to file_path and rename it into
+    place, so a concurrent GET sees either the old picture or the new one,
+    never a partial write.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), prefix=".upload-")
+    try:
+        uploaded_file.seek(0)
+        with os.fdopen(fd, "wb") as destination:
+            shutil.copyfileobj(uploaded_file.file, destination, length=PROFILE_PIC_COPY_BUFFER)
+        if settings.FILE_UPLOAD_PERMISSIONS is not None:
+            os.chmod(tmp_path, settings.FILE_UPLOAD_PERMISSIONS)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 
 @csrf_exempt
+@requires_auth
 def upload_profile_picture_view(request):
     """
     POST /media/profile-picture/
@@ -63,9 +91,9 @@ def upload_profile_picture_view(request):
     - Updates UserProfile.avatar_url = "/uploads/profile_pictures/<user_id>.<ext>".
     """
     if request.method != "POST":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, error_response = _require_auth(request)
+    user, error_response = require_auth(request)
     if error_response:
         return error_response
 
@@ -74,18 +102,16 @@ def upload_profile_picture_view(request):
 
     uploaded_file = request.FILES.get("file")
     if not uploaded_file:
-        return JsonResponse(
+        return json_response(
             {"detail": "file is required as multipart/form-data"},
             status=400,
         )
 
-    # determine extension
-    _, ext = os.path.splitext(uploaded_file.name)
-    ext = (ext or "").lower()
-    allowed_exts = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-    if ext not in allowed_exts:
-        return JsonResponse(
-            {"detail": f"Unsupported file type '{ext}'. Allowed: {sorted(allowed_exts)}"},
+    # determine extension from the content, not the client-supplied name
+    ext = _sniff_image_ext(uploaded_file)
+    if ext is None:
+        return json_response(
+            {"detail": f"Unsupported file type. Allowed: {_ALLOWED_IMAGE_TYPES}"},
             status=400,
         )
 
@@ -93,10 +119,8 @@ def upload_profile_picture_view(request):
     filename = f"{user.id}{ext}"
     file_path = os.path.join(PROFILE_PIC_DIR, filename)
 
-    # write file to disk (overwrite if exists)
-    with open(file_path, "wb+") as destination:
-        for chunk in uploaded_file.chunks():
-            destination.write(chunk)
+    # write file to disk (atomically replaces any existing one)
+    _write_upload_atomically(uploaded_file, file_path)
 
     # store relative URL path in profile (for FE or future direct serving)
     relative_url = f"/uploads/profile_pictures/{filename}"
@@ -105,7 +129,7 @@ def upload_profile_picture_view(request):
     profile.avatar_url = relative_url
     profile.save(update_fields=["avatar_url"])
 
-    return JsonResponse(
+    return json_response(
         {
             "detail": "Profile picture uploaded successfully",
             "avatar_url": relative_url,
@@ -123,7 +147,8 @@ def get_profile_picture_view(request, user_id):
     Behavior:
     - Looks up UserProfile by user_id.
     - Reads avatar_url to figure out the stored file.
-    - Streams the image bytes.
+    - Streams the image bytes, or delegates them to nginx via
+      X-Accel-Redirect when MEDIA_ACCEL_REDIRECT_PREFIX is set.
     """
     # get profile
     try:
@@ -140,11 +165,34 @@ def get_profile_picture_view(request, user_id):
     rel_path = avatar_url[len("/uploads/") :]  # "profile_pictures/xxx.ext"
     file_path = os.path.join(UPLOAD_BASE, rel_path)
 
-    if not os.path.exists(file_path):
+    try:
+        st = os.stat(file_path)
+    except OSError:
         return HttpResponseNotFound("Profile picture file not found")
 
+    # Conditional GET: a re-upload replaces the file (new mtime), so the
+    # ETag changes with it; an unchanged picture answers 304 with no body.
+    etag = f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+    not_modified = get_conditional_response(
+        request, etag=etag, last_modified=int(st.st_mtime)
+    )
+    if not_modified is not None:
+        not_modified["Cache-Control"] = PROFILE_PIC_CACHE_CONTROL
+        return not_modified
+
     content_type, _ = mimetypes.guess_type(file_path)
     if content_type is None:
         content_type = "application/octet-stream"
 
-    return FileResponse(open(file_path, "rb"), content_type=content_type)
+    accel_prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX
+    if accel_prefix:
+        # nginx serves the bytes from its internal location; Django only
+        # sends headers and the worker is freed right away
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel_prefix.rstrip("/") + "/" + rel_path
+    else:
+        response = FileResponse(open(file_path, "rb"), content_type=content_type)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(st.st_mtime)
+    response["Cache-Control"] = PROFILE_PIC_CACHE_CONTROL
+    return response
@@ -1,96 +1,58 @@
-from django.http import JsonResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.db.models import F
-from django.db.models.functions import Greatest
-from django.contrib.postgres.search import TrigramSimilarity
+from contextlib import contextmanager
 
-from customauth.token_utils import decrypt_and_decode_token
-from userprofile.models import UserProfile, HelperProfile, SeekerPreferences
+import orjson
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.db.models import Q
+from django.contrib.postgres.search import TrigramWordSimilarity
+
+from customauth.http_utils import method_not_allowed, require_auth, requires_auth
+from userprofile import response_cache
+from userprofile.models import HelperProfile, SeekerPreferences
+from userprofile.utils import (
+    HELPER_PROFILE_FIELDS,
+    SEEKER_PREFS_FIELDS,
+    parse_list_param,
+    parse_time_param,
+    profile_row_or_none,
+    row_fields,
+    split_helper_profile,
+    split_seeker_prefs,
+    split_user,
+)
+
+
+# Search traffic repeats a few popular queries; their bodies are reused
+# briefly (and dropped on any profile write, see userprofile.response_cache).
+SEARCH_CACHE_TTL_SECONDS = 30
+
+# Below this length a query has too few trigrams to rank by; it is matched
+# as a name/city prefix on the UPPER(...) text_pattern_ops btrees instead.
+FUZZY_MIN_QUERY_LEN = 3
 
 
 # ---------- common helpers ----------
 
-def _get_bearer_token(request):
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
-
-
-def _require_auth(request, allowed_types=None):
-    token = _get_bearer_token(request)
-    if not token:
-        return None, JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return None, JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
-
-    if allowed_types is not None and user.user_type not in allowed_types:
-        return None, JsonResponse(
-            {"detail": "Forbidden: insufficient role", "user_type": user.user_type},
-            status=403,
-        )
-
-    return user, None
-
-
-def _user_public_dict(user):
-    return {
-        "id": str(user.id),
-        "name": user.name,
-        "phone_number": user.phone_number,
-        "user_type": getattr(user, "user_type", None),
-    }
-
-
-def _profile_dict_or_none(profile: UserProfile | None):
-    if profile is None:
-        return None
-    return {
-        "id": str(profile.id),
-        "display_name": profile.display_name,
-        "avatar_url": profile.avatar_url,
-        "bio": profile.bio,
-        "created_at": profile.created_at.isoformat() if profile.created_at else None,
-        "updated_at": profile.updated_at.isoformat() if profile.updated_at else None,
-    }
-
-
-def _helper_profile_to_dict(hp: HelperProfile):
-    return {
-        "id": str(hp.id),
-        "services": hp.services,
-        "city": hp.city,
-        "area": hp.area,
-        "available_from": hp.available_from.isoformat(),
-        "available_to": hp.available_to.isoformat(),
-        "frequency_modes": hp.frequency_modes,
-        "experience_years": hp.experience_years,
-        "active": hp.active,
-        "created_at": hp.created_at.isoformat() if hp.created_at else None,
-        "updated_at": hp.updated_at.isoformat() if hp.updated_at else None,
-    }
-
-
-def _seeker_prefs_to_dict(prefs: SeekerPreferences):
-    return {
-        "id": str(prefs.id),
-        "required_services": prefs.required_services,
-        "city": prefs.city,
-        "area": prefs.area,
-        "from_time": prefs.from_time.isoformat(),
-        "to_time": prefs.to_time.isoformat(),
-        "frequency": prefs.frequency,
-        "created_at": prefs.created_at.isoformat() if prefs.created_at else None,
-        "updated_at": prefs.updated_at.isoformat() if prefs.updated_at else None,
-    }
+@contextmanager
+def _word_similarity_threshold(enabled):
+    """
+    Run the enclosed queries in one transaction with
+    pg_trgm.word_similarity_threshold set (transaction-local) to
+    SEARCH_WORD_SIMILARITY_THRESHOLD; a no-op when not enabled.
+    """
+    if not enabled:
+        yield
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            # set_config(..., true) == SET LOCAL, but takes a bound value
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+                [str(settings.SEARCH_WORD_SIMILARITY_THRESHOLD)],
+            )
+        yield
 
 
 def _parse_int(val, default=None):
@@ -100,28 +62,177 @@ def _parse_int(val, default=None):
         return default
 
 
-def _parse_time_param(val: str | None):
-    if not val:
-        return None
-    from datetime import time
-    try:
-        h, m = map(int, val.split(":"))
-        return time(h, m)
-    except Exception:
-        return None
+def _parse_filters(params):
+    """Filter params shared by both searches, as echoed back in the body."""
+    return {
+        "city": params.get("city"),
+        "area": params.get("area"),
+        "services": parse_list_param(params.get("services")),
+        "frequency": params.get("frequency"),
+        "from_time": params.get("from_time"),
+        "to_time": params.get("to_time"),
+    }
+
 
+def _filter_helpers(qs, params, filters):
+    if filters["city"]:
+        qs = qs.filter(city__iexact=filters["city"].strip())
+    if filters["area"]:
+        qs = qs.filter(area__iexact=filters["area"].strip())
+    if filters["services"]:
+        qs = qs.filter(services__contains=filters["services"])
+    if filters["frequency"]:
+        qs = qs.filter(frequency_modes__contains=[filters["frequency"].strip().lower()])
+    from_time = parse_time_param(filters["from_time"])
+    to_time = parse_time_param(filters["to_time"])
+    if from_time and to_time:
+        qs = qs.filter(available_from__lte=from_time, available_to__gte=to_time)
+    elif from_time:
+        qs = qs.filter(available_from__lte=from_time)
+    elif to_time:
+        qs = qs.filter(available_to__gte=to_time)
+    min_experience = _parse_int(params.get("min_experience"), None)
+    filters["min_experience"] = min_experience  # helper-only, echoed back
+    if min_experience is not None:
+        qs = qs.filter(experience_years__gte=min_experience)
+    return qs
+
+
+def _filter_seekers(qs, params, filters):
+    if filters["city"]:
+        qs = qs.filter(city__iexact=filters["city"].strip())
+    if filters["area"]:
+        qs = qs.filter(area__iexact=filters["area"].strip())
+    if filters["services"]:
+        qs = qs.filter(required_services__contains=filters["services"])
+    if filters["frequency"]:
+        qs = qs.filter(frequency__iexact=filters["frequency"].strip())
+    from_time = parse_time_param(filters["from_time"])
+    to_time = parse_time_param(filters["to_time"])
+    if from_time and to_time:
+        qs = qs.filter(from_time__gte=from_time, to_time__lte=to_time)
+    elif from_time:
+        qs = qs.filter(from_time__gte=from_time)
+    elif to_time:
+        qs = qs.filter(to_time__lte=to_time)
+    return qs
+
+
+def _make_search_view(
+    *,
+    name,
+    doc,
+    model,
+    allowed_types,
+    base_filter,
+    apply_filters,
+    fuzzy_order,
+    default_order,
+    own_fields,
+    user_key,
+    own_key,
+    split_own,
+):
+    """
+    Build one search view from frozen per-role config. Both searches share
+    auth, response caching, fuzzy/prefix matching, pagination and body
+    shape; only what is captured here differs.
+    """
+    cache_name = f"search:{name}"
+    fields = tuple(row_fields(own_fields, with_profile=True))
+    fuzzy_fields = fields + ("similarity",)
+
+    def view(request):
+        if request.method != "GET":
+            return method_not_allowed()
+
+        user, error_response = require_auth(request, allowed_types=allowed_types)
+        if error_response:
+            return error_response
+
+        params = request.GET
+        cache_key, body = response_cache.lookup(cache_name, params)
+        if body is not None:
+            return HttpResponse(body, content_type="application/json")
+
+        q = (params.get("q") or "").strip()
+
+        # pagination
+        page = _parse_int(params.get("page"), 1) or 1
+        page_size = _parse_int(params.get("page_size"), 20) or 20
+        if page_size > 100:
+            page_size = 100
+
+        # filters are applied BEFORE ranking
+        filters = _parse_filters(params)
+        qs = apply_filters(model.objects.filter(**base_filter), params, filters)
+
+        fuzzy = len(q) >= FUZZY_MIN_QUERY_LEN
+        if fuzzy:
+            # `%>` on the denormalized search_text probes its one trigram index
+            qs = qs.filter(search_text__trigram_word_similar=q)
+        elif q:
+            qs = qs.filter(Q(user__name__istartswith=q) | Q(city__istartswith=q))
+
+        start = (page - 1) * page_size
+        end = start + page_size
+        with _word_similarity_threshold(fuzzy):
+            total = qs.count()
+
+            # fuzzy ranking for full queries (rows already passed the %>
+            # prefilter), else just deterministic ordering
+            if fuzzy:
+                qs = qs.annotate(
+                    similarity=TrigramWordSimilarity(q, "search_text"),
+                ).order_by(*fuzzy_order)
+                qs = qs.values(*fuzzy_fields)
+            else:
+                qs = qs.order_by(*default_order).values(*fields)
+            # flat rows (own + user__* + user__profile__* columns), no model instances
+            rows = list(qs[start:end])
+
+        results = [
+            {
+                user_key: split_user(row),
+                "profile": profile_row_or_none(row),
+                own_key: split_own(row),
+            }
+            for row in rows
+        ]
+        if fuzzy:
+            for item, row in zip(results, rows):
+                item["similarity"] = float(row["similarity"] or 0.0)
+        elif q:
+            # prefix matches are unranked
+            for item in results:
+                item["similarity"] = None
+
+        body = orjson.dumps(
+            {
+                "query": q,
+                "filters": filters,
+                "pagination": {
+                    "page": page,
+                    "page_size": page_size,
+                    "total": total,
+                    "has_next": end < total,
+                },
+                "results": results,
+            }
+        )
+        response_cache.store(cache_key, body, timeout=SEARCH_CACHE_TTL_SECONDS)
+        return HttpResponse(body, content_type="application/json")
 
-def _parse_list_param(val: str | None):
-    if not val:
-        return []
-    return [p.strip().lower() for p in val.split(",") if p.strip()]
+    view.__name__ = view.__qualname__ = f"search_{name}_view"
+    view.__doc__ = doc
+    return csrf_exempt(requires_auth(view))
 
 
 # ---------- 1. Seeker searching HELPERS (fuzzy + filters + pagination) ----------
 
-@csrf_exempt
-def search_helpers_view(request):
-    """
+search_helpers_view = _make_search_view(
+    name="helpers",
+    doc="""
     GET /search/helpers/
         ?q=Anu%20Kolktaa
         &city=Kolkata
@@ -140,139 +251,29 @@ def search_helpers_view(request):
         - user.profile.display_name
         - helper_profile.city
         - helper_profile.area
+      q shorter than 3 chars is a prefix match on name / city (unranked)
     - Filters are applied BEFORE ranking:
         - city, area, services, frequency, time window, min_experience, active=True
-    """
-    if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
-
-    user, error_response = _require_auth(request, allowed_types={"user", "admin"})
-    if error_response:
-        return error_response
-
-    q = (request.GET.get("q") or "").strip()
-
-    # filters
-    city = request.GET.get("city")
-    area = request.GET.get("area")
-    services_param = request.GET.get("services")
-    frequency = request.GET.get("frequency")
-    from_time_param = request.GET.get("from_time")
-    to_time_param = request.GET.get("to_time")
-    min_exp_param = request.GET.get("min_experience")
-
-    services = _parse_list_param(services_param)
-    from_time = _parse_time_param(from_time_param)
-    to_time = _parse_time_param(to_time_param)
-    min_experience = _parse_int(min_exp_param, None)
-
-    # pagination
-    page = _parse_int(request.GET.get("page"), 1) or 1
-    page_size = _parse_int(request.GET.get("page_size"), 20) or 20
-    if page_size > 100:
-        page_size = 100
-
-    qs = (
-        HelperProfile.objects.filter(
-            user__user_type="helper",
-            active=True,
-        )
-        .select_related("user")
-        .prefetch_related("user__profile")
-    )
-
-    # apply filters
-    if city:
-        qs = qs.filter(city__iexact=city.strip())
-    if area:
-        qs = qs.filter(area__iexact=area.strip())
-    if services:
-        qs = qs.filter(services__contains=services)
-    if frequency:
-        qs = qs.filter(frequency_modes__contains=[frequency.strip().lower()])
-    if from_time and to_time:
-        qs = qs.filter(available_from__lte=from_time, available_to__gte=to_time)
-    elif from_time:
-        qs = qs.filter(available_from__lte=from_time)
-    elif to_time:
-        qs = qs.filter(available_to__gte=to_time)
-    if min_experience is not None:
-        qs = qs.filter(experience_years__gte=min_experience)
-
-    total = qs.count()
-
-    # fuzzy ranking if q present, else just deterministic ordering
-    if q:
-        qs = qs.annotate(
-            sim_name=TrigramSimilarity("user__name", q),
-            sim_display_name=TrigramSimilarity("user__profile__display_name", q),
-            sim_city=TrigramSimilarity("city", q),
-            sim_area=TrigramSimilarity("area", q),
-        ).annotate(
-            similarity=Greatest(
-                F("sim_name"),
-                F("sim_display_name"),
-                F("sim_city"),
-                F("sim_area"),
-            )
-        ).filter(
-            similarity__gt=0.1  # keep low threshold, filters are already applied
-        ).order_by("-similarity", "-experience_years")
-    else:
-        # no q -> order by experience desc, city, etc
-        qs = qs.order_by("-experience_years", "city", "area")
-
-    # pagination slice
-    start = (page - 1) * page_size
-    end = start + page_size
-    qs_page = qs[start:end]
-
-    results = []
-    for hp in qs_page:
-        helper_user = hp.user
-        try:
-            profile_obj = helper_user.profile
-        except UserProfile.DoesNotExist:
-            profile_obj = None
-
-        item = {
-            "helper": _user_public_dict(helper_user),
-            "profile": _profile_dict_or_none(profile_obj),
-            "helper_profile": _helper_profile_to_dict(hp),
-        }
-        if q:
-            item["similarity"] = float(getattr(hp, "similarity", 0.0))
-        results.append(item)
-
-    return JsonResponse(
-        {
-            "query": q,
-            "filters": {
-                "city": city,
-                "area": area,
-                "services": services,
-                "frequency": frequency,
-                "from_time": from_time_param,
-                "to_time": to_time_param,
-                "min_experience": min_experience,
-            },
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total": total,
-                "has_next": end < total,
-            },
-            "results": results,
-        },
-        status=200,
-    )
+    """,
+    model=HelperProfile,
+    allowed_types={"user", "admin"},
+    base_filter={"user__user_type": "helper", "active": True},
+    apply_filters=_filter_helpers,
+    fuzzy_order=("-similarity", "-experience_years"),
+    # no q -> order by experience desc, city, etc
+    default_order=("-experience_years", "city", "area"),
+    own_fields=HELPER_PROFILE_FIELDS,
+    user_key="helper",
+    own_key="helper_profile",
+    split_own=split_helper_profile,
+)
 
 
 # ---------- 2. Helper searching SEEKERS (fuzzy + filters + pagination) ----------
 
-@csrf_exempt
-def search_seekers_view(request):
-    """
+search_seekers_view = _make_search_view(
+    name="seekers",
+    doc="""
     GET /search/seekers/
         ?q=Kolkata%20Anu
         &city=Kolkata
@@ -290,118 +291,18 @@ def search_seekers_view(request):
         - profile.display_name
         - seeker_prefs.city
         - seeker_prefs.area
+      q shorter than 3 chars is a prefix match on name / city (unranked)
     - Filters:
         - same style as above but for SeekerPreferences
-    """
-    if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
-
-    user, error_response = _require_auth(request, allowed_types={"helper", "admin"})
-    if error_response:
-        return error_response
-
-    q = (request.GET.get("q") or "").strip()
-
-    city = request.GET.get("city")
-    area = request.GET.get("area")
-    services_param = request.GET.get("services")
-    frequency = request.GET.get("frequency")
-    from_time_param = request.GET.get("from_time")
-    to_time_param = request.GET.get("to_time")
-
-    services = _parse_list_param(services_param)
-    from_time = _parse_time_param(from_time_param)
-    to_time = _parse_time_param(to_time_param)
-
-    page = _parse_int(request.GET.get("page"), 1) or 1
-    page_size = _parse_int(request.GET.get("page_size"), 20) or 20
-    if page_size > 100:
-        page_size = 100
-
-    qs = (
-        SeekerPreferences.objects.filter(
-            user__user_type="user",
-        )
-        .select_related("user")
-        .prefetch_related("user__profile")
-    )
-
-    # filters
-    if city:
-        qs = qs.filter(city__iexact=city.strip())
-    if area:
-        qs = qs.filter(area__iexact=area.strip())
-    if services:
-        qs = qs.filter(required_services__contains=services)
-    if frequency:
-        qs = qs.filter(frequency__iexact=frequency.strip())
-    if from_time and to_time:
-        qs = qs.filter(from_time__gte=from_time, to_time__lte=to_time)
-    elif from_time:
-        qs = qs.filter(from_time__gte=from_time)
-    elif to_time:
-        qs = qs.filter(to_time__lte=to_time)
-
-    total = qs.count()
-
-    if q:
-        qs = qs.annotate(
-            sim_name=TrigramSimilarity("user__name", q),
-            sim_display_name=TrigramSimilarity("user__profile__display_name", q),
-            sim_city=TrigramSimilarity("city", q),
-            sim_area=TrigramSimilarity("area", q),
-        ).annotate(
-            similarity=Greatest(
-                F("sim_name"),
-                F("sim_display_name"),
-                F("sim_city"),
-                F("sim_area"),
-            )
-        ).filter(
-            similarity__gt=0.1
-        ).order_by("-similarity")
-    else:
-        qs = qs.order_by("city", "area", "from_time")
-
-    start = (page - 1) * page_size
-    end = start + page_size
-    qs_page = qs[start:end]
-
-    results = []
-    for prefs in qs_page:
-        seeker_user = prefs.user
-        try:
-            profile_obj = seeker_user.profile
-        except UserProfile.DoesNotExist:
-            profile_obj = None
-
-        item = {
-            "seeker": _user_public_dict(seeker_user),
-            "profile": _profile_dict_or_none(profile_obj),
-            "seeker_preferences": _seeker_prefs_to_dict(prefs),
-        }
-        if q:
-            item["similarity"] = float(getattr(prefs, "similarity", 0.0))
-        results.append(item)
-
-    return JsonResponse(
-        {
-            "query": q,
-            "filters": {
-                "city": city,
-                "area": area,
-                "services": services,
-                "frequency": frequency,
-                "from_time": from_time_param,
-                "to_time": to_time_param,
-            },
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total": total,
-                "has_next": end < total,
-            },
-            "results": results,
-        },
-        status=200,
-    )
+    """,
+    model=SeekerPreferences,
+    allowed_types={"helper", "admin"},
+    base_filter={"user__user_type": "user"},
+    apply_filters=_filter_seekers,
+    fuzzy_order=("-similarity",),
+    default_order=("city", "area", "from_time"),
+    own_fields=SEEKER_PREFS_FIELDS,
+    user_key="seeker",
+    own_key="seeker_preferences",
+    split_own=split_seeker_prefs,
+)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2025-12-09 14:10
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('userprofile', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='helperprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['services'], name='helper_services_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='helperprofile',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['frequency_modes'], name='helper_freq_modes_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='helperprofile',
+            index=models.Index(fields=['available_from', 'available_to'], name='userprofile_availab_8f86b0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seekerpreferences',
+            index=models.Index(fields=['city', 'frequency'], name='userprofile_city_94c8e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seekerpreferences',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['required_services'], name='seeker_req_services_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='seekerpreferences',
+            index=models.Index(fields=['from_time', 'to_time'], name='userprofile_from_ti_cf13d5_idx'),
+        ),
+    ]
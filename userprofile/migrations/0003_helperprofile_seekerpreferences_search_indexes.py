@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2025-12-10 11:02
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('userprofile', '0002_helperprofile_seekerpreferences_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='helperprofile',
+            index=models.Index(fields=['active', 'city', 'area'], name='userprofile_active_bb7a96_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='seekerpreferences',
+            index=models.Index(fields=['city', 'area'], name='userprofile_city_b7fc31_idx'),
+        ),
+    ]
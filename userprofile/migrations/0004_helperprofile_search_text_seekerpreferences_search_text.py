@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2025-12-11 09:30
+
+from django.db import migrations, models
+
+
+# concat_ws skips NULLs, so users without a profile get no stray token
+BACKFILL_SQL = [
+    """
+    UPDATE userprofile_helperprofile AS t
+    SET search_text = concat_ws(' ', u.name, p.display_name, t.city, t.area)
+    FROM customauth_user AS u
+    LEFT JOIN userprofile_userprofile AS p ON p.user_id = u.id
+    WHERE u.id = t.user_id
+    """,
+    """
+    UPDATE userprofile_seekerpreferences AS t
+    SET search_text = concat_ws(' ', u.name, p.display_name, t.city, t.area)
+    FROM customauth_user AS u
+    LEFT JOIN userprofile_userprofile AS p ON p.user_id = u.id
+    WHERE u.id = t.user_id
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customauth', '0007_trigram_extension'),
+        ('userprofile', '0003_helperprofile_seekerpreferences_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='helperprofile',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='seekerpreferences',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, reverse_sql=migrations.RunSQL.noop),
+    ]
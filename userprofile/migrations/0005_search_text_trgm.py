@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2025-12-11 09:31
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('userprofile', '0004_helperprofile_search_text_seekerpreferences_search_text'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='helperprofile',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('search_text', name='gin_trgm_ops'), name='helper_search_text_trgm'),
+        ),
+        AddIndexConcurrently(
+            model_name='seekerpreferences',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass('search_text', name='gin_trgm_ops'), name='seeker_search_text_trgm'),
+        ),
+    ]
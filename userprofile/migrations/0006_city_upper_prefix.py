@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2025-12-11 11:20
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('userprofile', '0005_search_text_trgm'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='helperprofile',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='text_pattern_ops'), name='helper_city_upper_prefix'),
+        ),
+        AddIndexConcurrently(
+            model_name='seekerpreferences',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('city'), name='text_pattern_ops'), name='seeker_city_upper_prefix'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2025-12-11 12:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('userprofile', '0006_city_upper_prefix'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='helperprofile',
+            index=models.Index(condition=models.Q(('active', True)), fields=['user'], name='hp_active_user_idx'),
+        ),
+    ]
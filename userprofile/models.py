@@ -1,6 +1,8 @@
 import uuid
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
 
 from customauth.models import User
 
@@ -77,12 +79,29 @@ class HelperProfile(models.Model):
     experience_years = models.PositiveIntegerField(default=0)
     active = models.BooleanField(default=True)
 
+    # "<user.name> <profile.display_name> <city> <area>", kept in sync by
+    # userprofile.signals; fuzzy search probes this one trigram index
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
             models.Index(fields=["city", "active"]),
+            # services__contains / frequency_modes__contains (array @>)
+            GinIndex(fields=["services"], name="helper_services_gin"),
+            GinIndex(fields=["frequency_modes"], name="helper_freq_modes_gin"),
+            # availability window covers a requested window
+            models.Index(fields=["available_from", "available_to"]),
+            # search pre-filter: active=True + city/area equality
+            models.Index(fields=["active", "city", "area"]),
+            # search join from helper users (user_type index) into active rows
+            models.Index(fields=["user"], condition=models.Q(active=True), name="hp_active_user_idx"),
+            # search: search_text %> q (pg_trgm word similarity)
+            GinIndex(OpClass("search_text", name="gin_trgm_ops"), name="helper_search_text_trgm"),
+            # short search queries: city__istartswith (and city__iexact)
+            models.Index(OpClass(Upper("city"), name="text_pattern_ops"), name="helper_city_upper_prefix"),
         ]
 
     def __str__(self):
@@ -118,8 +137,28 @@ class SeekerPreferences(models.Model):
     # "one_time", "weekly", "monthly"
     frequency = models.CharField(max_length=32)
 
+    # "<user.name> <profile.display_name> <city> <area>", kept in sync by
+    # userprofile.signals; fuzzy search probes this one trigram index
+    search_text = models.TextField(blank=True, default="", editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # helper matches: city equality + frequency IN helper's modes
+            models.Index(fields=["city", "frequency"]),
+            # required_services__contains / __contained_by (array @> / <@)
+            GinIndex(fields=["required_services"], name="seeker_req_services_gin"),
+            # seeker window inside a helper's availability
+            models.Index(fields=["from_time", "to_time"]),
+            # search pre-filter: city + area equality
+            models.Index(fields=["city", "area"]),
+            # search: search_text %> q (pg_trgm word similarity)
+            GinIndex(OpClass("search_text", name="gin_trgm_ops"), name="seeker_search_text_trgm"),
+            # short search queries: city__istartswith (and city__iexact)
+            models.Index(OpClass(Upper("city"), name="text_pattern_ops"), name="seeker_city_upper_prefix"),
+        ]
+
     def __str__(self):
         return f"SeekerPreferences({self.user.phone_number})"
@@ -0,0 +1,55 @@
+"""
+Cache of serialized listing responses built from profile data.
+
+    resp:gen                       -> generation (random, bumped on writes)
+    resp:<name>:<gen>:<blake2b>    -> orjson-encoded response body
+
+The digest covers the sorted query params, so equivalent URLs share an
+entry. Saving or deleting a User, UserProfile, HelperProfile or
+SeekerPreferences bumps the generation (see signals.py), which orphans
+every cached body at once; entries otherwise expire after
+RESPONSE_CACHE_TTL_SECONDS.
+"""
+import hashlib
+import os
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+
+RESPONSE_CACHE_TTL_SECONDS = 60
+
+_GEN_KEY = "resp:gen"
+_BODY_PREFIX = "resp:"
+
+
+def generation():
+    gen = cache.get(_GEN_KEY)
+    if gen is None:
+        cache.add(_GEN_KEY, os.urandom(8).hex(), timeout=None)
+        gen = cache.get(_GEN_KEY)
+    return gen
+
+
+def lookup(name: str, params):
+    """
+    (key, body) for a listing and its QueryDict; body is None on a miss.
+    The generation is read here, before the caller queries the DB, so a
+    write racing with the build still orphans the entry stored after it.
+    """
+    digest = hashlib.blake2b(
+        urlencode(sorted(params.lists()), doseq=True).encode("utf-8"),
+        digest_size=16,
+    ).hexdigest()
+    key = f"{_BODY_PREFIX}{name}:{generation()}:{digest}"
+    return key, cache.get(key)
+
+
+def store(key: str, body: bytes, timeout: int = RESPONSE_CACHE_TTL_SECONDS) -> None:
+    cache.set(key, body, timeout=timeout)
+
+
+def bump_generation() -> None:
+    """
+    Orphan every cached listing body.
+    """
+    cache.set(_GEN_KEY, os.urandom(8).hex(), timeout=None)
@@ -0,0 +1,98 @@
+"""
+Process-local copy of the Service catalog (slug -> id).
+
+    svc:version -> random token, replaced on every catalog write
+
+The table is a few KB, so each process keeps all of it and reloads only
+when the shared version no longer matches the one it loaded under; slug
+checks are then a dict lookup instead of a query. admin_services_view
+bumps the version after creating or deleting a service. A slug missing
+from the copy is re-checked against the table before it is reported
+unknown, since a per-process cache backend never sees another process's
+bump; those re-checks are rate-limited so bogus slugs can't force a table
+read per request.
+"""
+import os
+import threading
+import time
+
+from django.core.cache import cache
+
+from .models import Service
+
+_VERSION_KEY = "svc:version"
+
+# a miss re-reads the table at most this often per process
+CONFIRM_RELOAD_INTERVAL_SECONDS = 5
+
+# (version, {slug: id}), swapped in whole so readers never see a half-load
+_services_local = (None, {})
+_confirm_lock = threading.Lock()
+_last_confirm_reload = None
+
+
+def version():
+    ver = cache.get(_VERSION_KEY)
+    if ver is None:
+        cache.add(_VERSION_KEY, os.urandom(8).hex(), timeout=None)
+        ver = cache.get(_VERSION_KEY)
+    return ver
+
+
+def bump_version() -> None:
+    cache.set(_VERSION_KEY, os.urandom(8).hex(), timeout=None)
+
+
+def _reload(ver):
+    global _services_local
+    _services_local = (ver, dict(Service.objects.values_list("slug", "id")))
+    return _services_local[1]
+
+
+def _confirm_miss():
+    """
+    The catalog after re-reading it to confirm a miss, or the current copy
+    if a confirm-reload already ran in the last
+    CONFIRM_RELOAD_INTERVAL_SECONDS.
+    """
+    global _last_confirm_reload
+    now = time.monotonic()
+    with _confirm_lock:
+        if _last_confirm_reload is not None and now - _last_confirm_reload < CONFIRM_RELOAD_INTERVAL_SECONDS:
+            return _services_local[1]
+        _last_confirm_reload = now
+    return _reload(version())
+
+
+def services_by_slug():
+    """
+    {slug: id} for the whole catalog. The version is read before the
+    table, so a write racing with the reload leaves this copy stale for
+    at most one more call.
+    """
+    ver = version()
+    if _services_local[0] != ver:
+        return _reload(ver)
+    return _services_local[1]
+
+
+def get_service_id(slug: str):
+    """Id of the service with this slug, or None if there is none."""
+    service_id = services_by_slug().get(slug)
+    if service_id is None:
+        # the version only moves in this process's cache when the cache
+        # backend is per-process (LocMem); confirm a miss against the table
+        service_id = _confirm_miss().get(slug)
+    return service_id
+
+
+def unknown_slugs(slugs):
+    """The given slugs that are not in the catalog, in input order."""
+    known = services_by_slug()
+    unknown = [s for s in slugs if s not in known]
+    if unknown:
+        # see get_service_id: a slug added through another process may be
+        # missing here, so re-read the table before rejecting
+        known = _confirm_miss()
+        unknown = [s for s in unknown if s not in known]
+    return unknown
@@ -0,0 +1,93 @@
+from django.db.models import F, Func, OuterRef, Subquery, TextField, Value
+from django.db.models.signals import post_delete, post_save
+
+from customauth.models import User
+from . import response_cache
+from .models import UserProfile, HelperProfile, SeekerPreferences
+from .utils import PROFILE_FIELDS, USER_PUBLIC_FIELDS
+
+# columns that feed HelperProfile/SeekerPreferences.search_text, per model
+_SEARCH_TEXT_SOURCES = {
+    User: {"name"},
+    UserProfile: {"display_name"},
+    HelperProfile: {"city", "area"},
+    SeekerPreferences: {"city", "area"},
+}
+
+
+# columns of User/UserProfile that cached listing bodies serialize; every
+# HelperProfile/SeekerPreferences column is either serialized or filtered on
+_RESPONSE_CACHE_SOURCES = {
+    User: frozenset(USER_PUBLIC_FIELDS),
+    UserProfile: frozenset(PROFILE_FIELDS),
+}
+
+
+def _bump_response_cache(sender, created=False, update_fields=None, **kwargs):
+    # a new user has no profile rows yet, so appears in no cached listing
+    if sender is User and created:
+        return
+    # saves that touch none of the serialized columns (password rehash on
+    # login, ...) leave every cached body valid
+    sources = _RESPONSE_CACHE_SOURCES.get(sender)
+    if update_fields is not None and sources is not None and not sources & set(update_fields):
+        return
+    response_cache.bump_generation()
+
+
+def refresh_search_text(models, user_id):
+    """
+    Recompute search_text for the given user's rows in one UPDATE per
+    model, entirely in SQL (the name and display name come in as
+    subqueries). .update() sends no signals, so this cannot recurse.
+    """
+    name = User.objects.filter(id=OuterRef("user_id")).values("name")[:1]
+    display_name = UserProfile.objects.filter(user_id=OuterRef("user_id")).values("display_name")[:1]
+    search_text = Func(
+        Value(" "), Subquery(name), Subquery(display_name), F("city"), F("area"),
+        function="CONCAT_WS", output_field=TextField(),
+    )
+    for model in models:
+        model.objects.filter(user_id=user_id).update(search_text=search_text)
+
+
+def _sync_search_text(sender, instance, update_fields=None, **kwargs):
+    # saves that touch none of the source columns (password rehash,
+    # avatar upload, ...) leave search_text as it is
+    if update_fields is not None and not _SEARCH_TEXT_SOURCES[sender] & set(update_fields):
+        return
+    if sender in (HelperProfile, SeekerPreferences):
+        refresh_search_text([sender], instance.user_id)
+    else:
+        user_id = instance.id if sender is User else instance.user_id
+        refresh_search_text([HelperProfile, SeekerPreferences], user_id)
+
+
+def _sync_search_text_on_delete(sender, instance, **kwargs):
+    # a deleted UserProfile drops display_name from the user's rows
+    refresh_search_text([HelperProfile, SeekerPreferences], instance.user_id)
+
+
+def connect_signals():
+    # search_text first: receivers run in connection order, and the cache
+    # bump below must not let a request cache results from stale text
+    for model in _SEARCH_TEXT_SOURCES:
+        post_save.connect(
+            _sync_search_text, sender=model,
+            dispatch_uid=f"search_text_save_{model.__name__}",
+        )
+    post_delete.connect(
+        _sync_search_text_on_delete, sender=UserProfile,
+        dispatch_uid="search_text_delete_UserProfile",
+    )
+
+    # every model that feeds a cached listing body
+    for model in (User, UserProfile, HelperProfile, SeekerPreferences):
+        post_save.connect(
+            _bump_response_cache, sender=model,
+            dispatch_uid=f"response_cache_save_{model.__name__}",
+        )
+        post_delete.connect(
+            _bump_response_cache, sender=model,
+            dispatch_uid=f"response_cache_delete_{model.__name__}",
+        )
@@ -1,3 +1,68 @@
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from . import service_catalog
+from .models import Service
+from .views import _clean_helper_payload, _clean_seeker_payload
+
+
+def _helper_payload(services):
+    return {
+        "services": services,
+        "city": "Kolkata",
+        "area": "Salt Lake",
+        "available_from": "09:00",
+        "available_to": "15:00",
+        "frequency_modes": ["monthly"],
+    }
+
+
+def _seeker_payload(required_services):
+    return {
+        "required_services": required_services,
+        "city": "Kolkata",
+        "area": "Salt Lake",
+        "from_time": "09:00",
+        "to_time": "15:00",
+        "frequency": "monthly",
+    }
+
+
+class ServiceSlugValidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        service_catalog._services_local = (None, {})
+        service_catalog._last_confirm_reload = None
+        Service.objects.create(slug="cooking", name="Cooking")
+        Service.objects.create(slug="cleaning", name="Cleaning")
+
+    def test_helper_known_services_accepted(self):
+        defaults, detail = _clean_helper_payload(_helper_payload(["Cooking", "cleaning"]))
+        self.assertIsNone(detail)
+        self.assertEqual(defaults["services"], ["cooking", "cleaning"])
+
+    def test_helper_unknown_services_rejected(self):
+        defaults, detail = _clean_helper_payload(_helper_payload(["cooking", "ironing", "gardening"]))
+        self.assertIsNone(defaults)
+        self.assertEqual(detail, "unknown services: ironing, gardening")
+
+    def test_seeker_known_services_accepted(self):
+        defaults, detail = _clean_seeker_payload(_seeker_payload(["cleaning"]))
+        self.assertIsNone(detail)
+        self.assertEqual(defaults["required_services"], ["cleaning"])
+
+    def test_seeker_unknown_services_rejected(self):
+        defaults, detail = _clean_seeker_payload(_seeker_payload(["ironing"]))
+        self.assertIsNone(defaults)
+        self.assertEqual(detail, "unknown services: ironing")
+
+    def test_service_added_without_version_bump_is_found(self):
+        # another process's create never moves this process's LocMem version
+        service_catalog.services_by_slug()
+        Service.objects.create(slug="laundry", name="Laundry")
+        self.assertEqual(service_catalog.unknown_slugs(["laundry"]), [])
+
+    def test_unknown_slug_reload_is_rate_limited(self):
+        self.assertEqual(service_catalog.unknown_slugs(["ironing"]), ["ironing"])
+        with self.assertNumQueries(0):
+            self.assertEqual(service_catalog.unknown_slugs(["ironing"]), ["ironing"])
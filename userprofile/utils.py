@@ -0,0 +1,163 @@
+"""
+Serialization and query-param helpers shared by the profile, filter,
+matching and search views.
+
+Serializers hand back UUID/datetime/time values as-is; json_response
+(orjson) encodes them natively.
+"""
+import operator
+import re
+from datetime import time
+
+from .models import UserProfile, HelperProfile, SeekerPreferences
+
+
+# ---------- serializers ----------
+
+def user_public_dict(user):
+    return {
+        "id": user.id,
+        "name": user.name,
+        "phone_number": user.phone_number,
+        "user_type": getattr(user, "user_type", None),
+    }
+
+
+def profile_dict_or_none(profile: UserProfile | None):
+    if profile is None:
+        return None
+    return {
+        "id": profile.id,
+        "display_name": profile.display_name,
+        "avatar_url": profile.avatar_url,
+        "bio": profile.bio,
+        "created_at": profile.created_at,
+        "updated_at": profile.updated_at,
+    }
+
+
+def helper_profile_to_dict(hp: HelperProfile):
+    return {
+        "id": hp.id,
+        "services": hp.services,
+        "city": hp.city,
+        "area": hp.area,
+        "available_from": hp.available_from,
+        "available_to": hp.available_to,
+        "frequency_modes": hp.frequency_modes,
+        "experience_years": hp.experience_years,
+        "active": hp.active,
+        "created_at": hp.created_at,
+        "updated_at": hp.updated_at,
+    }
+
+
+def seeker_prefs_to_dict(prefs: SeekerPreferences):
+    return {
+        "id": prefs.id,
+        "required_services": prefs.required_services,
+        "city": prefs.city,
+        "area": prefs.area,
+        "from_time": prefs.from_time,
+        "to_time": prefs.to_time,
+        "frequency": prefs.frequency,
+        "created_at": prefs.created_at,
+        "updated_at": prefs.updated_at,
+    }
+
+
+# ---------- values() rows ----------
+# Listing endpoints fetch flat .values() rows and regroup them into the same
+# nested shape the serializers above produce, without building model instances.
+
+USER_PUBLIC_FIELDS = ("id", "name", "phone_number", "user_type")
+PROFILE_FIELDS = ("id", "display_name", "avatar_url", "bio", "created_at", "updated_at")
+HELPER_PROFILE_FIELDS = (
+    "id", "services", "city", "area", "available_from", "available_to",
+    "frequency_modes", "experience_years", "active", "created_at", "updated_at",
+)
+SEEKER_PREFS_FIELDS = (
+    "id", "required_services", "city", "area", "from_time", "to_time",
+    "frequency", "created_at", "updated_at",
+)
+
+
+def row_fields(own_fields, with_profile: bool = False):
+    """
+    values() names for a HelperProfile/SeekerPreferences row plus its user
+    and, optionally, the user's profile.
+    """
+    fields = list(own_fields)
+    fields += ["user__" + f for f in USER_PUBLIC_FIELDS]
+    if with_profile:
+        fields += ["user__profile__" + f for f in PROFILE_FIELDS]
+    return fields
+
+
+def _row_splitter(prefix: str, fields):
+    # one itemgetter call does every key lookup in C; zip pairs the values
+    # back up with the short field names
+    getter = operator.itemgetter(*(prefix + f for f in fields))
+    return lambda row: dict(zip(fields, getter(row)))
+
+
+split_user = _row_splitter("user__", USER_PUBLIC_FIELDS)
+split_profile = _row_splitter("user__profile__", PROFILE_FIELDS)
+split_helper_profile = _row_splitter("", HELPER_PROFILE_FIELDS)
+split_seeker_prefs = _row_splitter("", SEEKER_PREFS_FIELDS)
+
+
+def profile_row_or_none(row: dict):
+    # LEFT JOIN: every profile column is NULL when the user has none
+    if row["user__profile__id"] is None:
+        return None
+    return split_profile(row)
+
+
+# ---------- query param parsing ----------
+
+# 0-23 (optionally one digit) : 00-59; range-checked by the pattern itself
+_HHMM_RE = re.compile(r"([01]?\d|2[0-3]):([0-5]\d)")
+
+
+def parse_bool_param(val: str | None):
+    if val is None:
+        return None
+    v = val.strip().lower()
+    if v in ("1", "true", "yes", "y", "on"):
+        return True
+    if v in ("0", "false", "no", "n", "off"):
+        return False
+    return None
+
+
+def parse_int_param(val: str | None):
+    if val is None or val.strip() == "":
+        return None
+    try:
+        return int(val)
+    except ValueError:
+        return None
+
+
+def parse_time_param(val: str | None):
+    """
+    Expect "HH:MM". Return datetime.time or None.
+    Also used for JSON body values, so non-strings give None.
+    """
+    if not isinstance(val, str):
+        return None
+    m = _HHMM_RE.fullmatch(val)
+    if m is None:
+        return None
+    return time(int(m.group(1)), int(m.group(2)))
+
+
+def parse_list_param(val: str | None):
+    """
+    Parse comma-separated string into lowercase-trimmed list.
+    "cooking, cleaning" -> ["cooking","cleaning"]
+    """
+    if not val:
+        return []
+    return [p.strip().lower() for p in val.split(",") if p.strip()]
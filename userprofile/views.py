@@ -1,108 +1,150 @@
-import json
-
-from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
 
-from customauth.token_utils import decrypt_and_decode_token
+from customauth.http_utils import (
+    json_response,
+    method_not_allowed,
+    parse_json_body,
+    require_auth,
+    requires_auth,
+)
 from .models import (
     UserProfile,
     Service,
     HelperProfile,
     SeekerPreferences,
 )
+from .service_catalog import bump_version as bump_service_version, unknown_slugs
+from .utils import helper_profile_to_dict, parse_time_param, seeker_prefs_to_dict
 
 
 # ---------- common helpers ----------
 
-def _json_body(request):
-    if not request.body:
-        return {}
-    try:
-        return json.loads(request.body.decode("utf-8"))
-    except json.JSONDecodeError:
-        return None
+def _service_to_dict(service: Service):
+    return {
+        "id": service.id,
+        "slug": service.slug,
+        "name": service.name,
+    }
 
 
-def _get_bearer_token(request):
-    auth_header = request.META.get("HTTP_AUTHORIZATION", "")
-    if not auth_header.startswith("Bearer "):
-        return None
-    return auth_header.split(" ", 1)[1].strip() or None
+# Own-profile GETs are polled by the apps; let them revalidate cheaply.
+OWN_PROFILE_CACHE_CONTROL = "private, max-age=5"
 
 
-def _require_auth(request, allowed_types=None):
+def _own_profile_response(request, key, obj, to_dict):
     """
-    Decode token, return (user, error_response).
-
-    allowed_types: list/set of user_type strings, e.g. ["admin"].
-    If user_type not allowed -> 403.
+    200 with {key: to_dict(obj)}, or a bodiless 304 when If-None-Match
+    already holds the ETag derived from obj.updated_at (auto_now, so it
+    moves on every save).
     """
-    token = _get_bearer_token(request)
-    if not token:
-        return None, JsonResponse(
-            {"detail": "Authorization header with Bearer token required"},
-            status=401,
-        )
-
-    user, session, error = decrypt_and_decode_token(token)
-    if error is not None or user is None:
-        return None, JsonResponse(
-            {"detail": "Invalid or expired token", "error": error},
-            status=401,
-        )
-
-    if allowed_types is not None:
-        if user.user_type not in allowed_types:
-            return None, JsonResponse(
-                {"detail": "Forbidden: insufficient role", "user_type": user.user_type},
-                status=403,
-            )
-
-    return user, None
-
-
-def _service_to_dict(service: Service):
-    return {
-        "id": str(service.id),
-        "slug": service.slug,
-        "name": service.name,
+    etag = f'W/"{int(obj.updated_at.timestamp() * 1_000_000):x}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = json_response({key: to_dict(obj)}, status=200)
+    response["ETag"] = etag
+    response["Cache-Control"] = OWN_PROFILE_CACHE_CONTROL
+    # same URL, different body per token
+    patch_vary_headers(response, ("Authorization",))
+    return response
+
+
+def _clean_helper_payload(data: dict):
+    """
+    Validate a helper capability body in one pass.
+    Returns (update_or_create defaults, None) or (None, error detail).
+    """
+    services = data.get("services")
+    if not isinstance(services, list) or not services:
+        return None, "services must be a non-empty list of slugs"
+
+    city = data.get("city")
+    available_from = data.get("available_from")
+    available_to = data.get("available_to")
+    if not city or not available_from or not available_to:
+        return None, "city, available_from, available_to are required"
+
+    frequency_modes = data.get("frequency_modes")
+    if not isinstance(frequency_modes, list) or not frequency_modes:
+        return None, "frequency_modes must be a non-empty list"
+
+    from_t = parse_time_param(available_from)
+    to_t = parse_time_param(available_to)
+    if from_t is None or to_t is None:
+        return None, "available_from and available_to must be HH:MM"
+
+    services = [str(s).strip().lower() for s in services]
+    unknown = unknown_slugs(services)
+    if unknown:
+        return None, f"unknown services: {', '.join(unknown)}"
+
+    area = data.get("area")
+    defaults = {
+        "services": services,
+        "city": str(city).strip(),
+        "area": str(area).strip() if area else "",
+        "available_from": from_t,
+        "available_to": to_t,
+        "frequency_modes": [str(f).strip().lower() for f in frequency_modes],
     }
 
+    # omitted fields keep their stored value (or the model default on create)
+    experience_years = data.get("experience_years")
+    if experience_years is not None:
+        try:
+            defaults["experience_years"] = int(experience_years)
+        except (TypeError, ValueError):
+            return None, "experience_years must be an integer"
+    active = data.get("active")
+    if active is not None:
+        defaults["active"] = bool(active)
 
-def _helper_profile_to_dict(hp: HelperProfile):
-    return {
-        "id": str(hp.id),
-        "services": hp.services,
-        "city": hp.city,
-        "area": hp.area,
-        "available_from": hp.available_from.isoformat(),
-        "available_to": hp.available_to.isoformat(),
-        "frequency_modes": hp.frequency_modes,
-        "experience_years": hp.experience_years,
-        "active": hp.active,
-        "created_at": hp.created_at.isoformat() if hp.created_at else None,
-        "updated_at": hp.updated_at.isoformat() if hp.updated_at else None,
-    }
+    return defaults, None
 
 
-def _seeker_prefs_to_dict(prefs: SeekerPreferences):
+def _clean_seeker_payload(data: dict):
+    """
+    Validate a seeker preferences body in one pass.
+    Returns (update_or_create defaults, None) or (None, error detail).
+    available_for_work is accepted but not stored: SeekerPreferences has
+    no such column.
+    """
+    required_services = data.get("required_services")
+    if not isinstance(required_services, list) or not required_services:
+        return None, "required_services must be a non-empty list of slugs"
+
+    city = data.get("city")
+    from_time = data.get("from_time")
+    to_time = data.get("to_time")
+    frequency = data.get("frequency")
+    if not city or not from_time or not to_time or not frequency:
+        return None, "city, from_time, to_time, and frequency are required"
+
+    from_t = parse_time_param(from_time)
+    to_t = parse_time_param(to_time)
+    if from_t is None or to_t is None:
+        return None, "from_time and to_time must be HH:MM"
+
+    required_services = [str(s).strip().lower() for s in required_services]
+    unknown = unknown_slugs(required_services)
+    if unknown:
+        return None, f"unknown services: {', '.join(unknown)}"
+
+    area = data.get("area")
     return {
-        "id": str(prefs.id),
-        "required_services": prefs.required_services,
-        "city": prefs.city,
-        "area": prefs.area,
-        "from_time": prefs.from_time.isoformat(),
-        "to_time": prefs.to_time.isoformat(),
-        "frequency": prefs.frequency,
-        "available_for_work": prefs.available_for_work,
-        "created_at": prefs.created_at.isoformat() if prefs.created_at else None,
-        "updated_at": prefs.updated_at.isoformat() if prefs.updated_at else None,
-    }
+        "required_services": required_services,
+        "city": str(city).strip(),
+        "area": str(area).strip() if area else "",
+        "from_time": from_t,
+        "to_time": to_t,
+        "frequency": str(frequency).strip().lower(),
+    }, None
 
 
 # ---------- ADMIN: add/remove services ----------
 
 @csrf_exempt
+@requires_auth
 def admin_services_view(request):
     """
     Admin-only endpoint for managing Service catalog.
@@ -120,20 +162,20 @@ def admin_services_view(request):
       "slug": "cooking"
     }
     """
-    user, error_response = _require_auth(request, allowed_types={"admin"})
+    user, error_response = require_auth(request, allowed_types={"admin"})
     if error_response:
         return error_response
 
     if request.method == "POST":
-        data = _json_body(request)
+        data = parse_json_body(request)
         if data is None:
-            return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+            return json_response({"detail": "Invalid JSON body"}, status=400)
 
         slug = (data.get("slug") or "").strip().lower()
         name = (data.get("name") or "").strip()
 
         if not slug or not name:
-            return JsonResponse(
+            return json_response(
                 {"detail": "slug and name are required"},
                 status=400,
             )
@@ -142,12 +184,14 @@ def admin_services_view(request):
             slug=slug,
             defaults={"name": name},
         )
-        if not created:
-            # update name if already exists
+        if created:
+            bump_service_version()
+        else:
+            # update name if already exists (slug -> id is unchanged)
             service.name = name
             service.save(update_fields=["name"])
 
-        return JsonResponse(
+        return json_response(
             {
                 "detail": "Service created/updated",
                 "service": _service_to_dict(service),
@@ -156,35 +200,36 @@ def admin_services_view(request):
         )
 
     if request.method == "DELETE":
-        data = _json_body(request)
+        data = parse_json_body(request)
         if data is None:
-            return JsonResponse({"detail": "Invalid JSON body"}, status=400)
+            return json_response({"detail": "Invalid JSON body"}, status=400)
 
         slug = (data.get("slug") or "").strip().lower()
         if not slug:
-            return JsonResponse(
+            return json_response(
                 {"detail": "slug is required"},
                 status=400,
             )
 
-        try:
-            service = Service.objects.get(slug=slug)
-        except Service.DoesNotExist:
-            return JsonResponse(
+        # single DELETE ... WHERE slug = %s; nothing references Service
+        deleted, _ = Service.objects.filter(slug=slug).delete()
+        if not deleted:
+            return json_response(
                 {"detail": "Service not found"},
                 status=404,
             )
 
-        service.delete()
-        return JsonResponse(
+        bump_service_version()
+        return json_response(
             {"detail": "Service deleted", "slug": slug},
             status=200,
         )
 
-    return JsonResponse({"detail": "Method not allowed"}, status=405)
+    return method_not_allowed()
 
 
 @csrf_exempt
+@requires_auth
 def get_services_view(request):
     """
     GET /profile/services/
@@ -202,9 +247,9 @@ def get_services_view(request):
     All authenticated users may access.
     """
     if request.method != "GET":
-        return JsonResponse({"detail": "Method not allowed"}, status=405)
+        return method_not_allowed()
 
-    user, err = _require_auth(request)  # already exists in your file
+    user, err = require_auth(request)  # already exists in your file
     if err:
         return err
 
@@ -212,20 +257,21 @@ def get_services_view(request):
 
     results = [
         {
-            "id": str(s.id),
+            "id": s.id,
             "name": s.name,
             "slug": s.slug,
         }
         for s in services
     ]
 
-    return JsonResponse({"services": results}, status=200)
+    return json_response({"services": results}, status=200)
 
 
 
 # ---------- HELPER CAPABILITY: add/edit ----------
 
 @csrf_exempt
+@requires_auth
 def helper_profile_view(request):
     """
     Helper capability add/edit.
@@ -249,7 +295,7 @@ def helper_profile_view(request):
       "active": true
     }
     """
-    user, error_response = _require_auth(request, allowed_types={"helper"})
+    user, error_response = require_auth(request, allowed_types={"helper"})
     if error_response:
         return error_response
 
@@ -257,91 +303,37 @@ def helper_profile_view(request):
         try:
             hp = HelperProfile.objects.get(user=user)
         except HelperProfile.DoesNotExist:
-            return JsonResponse(
+            return json_response(
                 {"detail": "Helper profile not found"},
                 status=404,
             )
 
-        return JsonResponse(
-            {"helper_profile": _helper_profile_to_dict(hp)},
-            status=200,
-        )
+        return _own_profile_response(request, "helper_profile", hp, helper_profile_to_dict)
 
     if request.method == "POST":
-        data = _json_body(request)
-        if data is None:
-            return JsonResponse({"detail": "Invalid JSON body"}, status=400)
-
-        services = data.get("services")
-        city = data.get("city")
-        area = data.get("area")
-        available_from = data.get("available_from")
-        available_to = data.get("available_to")
-        frequency_modes = data.get("frequency_modes")
-        experience_years = data.get("experience_years")
-        active = data.get("active")
-
-        # basic validation
-        if not isinstance(services, list) or not services:
-            return JsonResponse(
-                {"detail": "services must be a non-empty list of slugs"},
-                status=400,
-            )
-
-        if not city or not available_from or not available_to:
-            return JsonResponse(
-                {"detail": "city, available_from, available_to are required"},
-                status=400,
-            )
-
-        if not isinstance(frequency_modes, list) or not frequency_modes:
-            return JsonResponse(
-                {"detail": "frequency_modes must be a non-empty list"},
-                status=400,
-            )
-
-        from datetime import time
-
-        def _parse_time(value):
-            try:
-                hour, minute = map(int, value.split(":"))
-                return time(hour, minute)
-            except Exception:
-                return None
-
-        from_t = _parse_time(available_from)
-        to_t = _parse_time(available_to)
-        if from_t is None or to_t is None:
-            return JsonResponse(
-                {"detail": "available_from and available_to must be HH:MM"},
-                status=400,
-            )
+        data = parse_json_body(request)
+        if not isinstance(data, dict):
+            return json_response({"detail": "Invalid JSON body"}, status=400)
 
-        hp, _created = HelperProfile.objects.get_or_create(user=user)
+        defaults, detail = _clean_helper_payload(data)
+        if detail:
+            return json_response({"detail": detail}, status=400)
 
-        hp.services = [str(s).strip().lower() for s in services]
-        hp.city = str(city).strip()
-        hp.area = str(area).strip() if area else ""
-        hp.available_from = from_t
-        hp.available_to = to_t
-        hp.frequency_modes = [str(f).strip().lower() for f in frequency_modes]
-        hp.experience_years = int(experience_years) if experience_years is not None else hp.experience_years
-        if active is not None:
-            hp.active = bool(active)
+        # UPDATE of just these columns (+ updated_at) when the row exists
+        hp, _created = HelperProfile.objects.update_or_create(user=user, defaults=defaults)
 
-        hp.save()
-
-        return JsonResponse(
-            {"helper_profile": _helper_profile_to_dict(hp)},
+        return json_response(
+            {"helper_profile": helper_profile_to_dict(hp)},
             status=200,
         )
 
-    return JsonResponse({"detail": "Method not allowed"}, status=405)
+    return method_not_allowed()
 
 
 # ---------- SEEKER REQUIREMENTS: add/edit ----------
 
 @csrf_exempt
+@requires_auth
 def seeker_prefs_view(request):
     """
     Seeker requirements/preferences add/edit.
@@ -364,7 +356,7 @@ def seeker_prefs_view(request):
       "available_for_work": true
     }
     """
-    user, error_response = _require_auth(request, allowed_types={"user"})
+    user, error_response = require_auth(request, allowed_types={"user"})
     if error_response:
         return error_response
 
@@ -372,74 +364,27 @@ def seeker_prefs_view(request):
         try:
             prefs = SeekerPreferences.objects.get(user=user)
         except SeekerPreferences.DoesNotExist:
-            return JsonResponse(
+            return json_response(
                 {"detail": "Seeker preferences not found"},
                 status=404,
             )
 
-        return JsonResponse(
-            {"seeker_preferences": _seeker_prefs_to_dict(prefs)},
-            status=200,
-        )
+        return _own_profile_response(request, "seeker_preferences", prefs, seeker_prefs_to_dict)
 
     if request.method == "POST":
-        data = _json_body(request)
-        if data is None:
-            return JsonResponse({"detail": "Invalid JSON body"}, status=400)
-
-        required_services = data.get("required_services")
-        city = data.get("city")
-        area = data.get("area")
-        from_time = data.get("from_time")
-        to_time = data.get("to_time")
-        frequency = data.get("frequency")
-        available_for_work = data.get("available_for_work")
-
-        if not isinstance(required_services, list) or not required_services:
-            return JsonResponse(
-                {"detail": "required_services must be a non-empty list of slugs"},
-                status=400,
-            )
-
-        if not city or not from_time or not to_time or not frequency:
-            return JsonResponse(
-                {"detail": "city, from_time, to_time, and frequency are required"},
-                status=400,
-            )
-
-        from datetime import time
-
-        def _parse_time(value):
-            try:
-                hour, minute = map(int, value.split(":"))
-                return time(hour, minute)
-            except Exception:
-                return None
-
-        from_t = _parse_time(from_time)
-        to_t = _parse_time(to_time)
-        if from_t is None or to_t is None:
-            return JsonResponse(
-                {"detail": "from_time and to_time must be HH:MM"},
-                status=400,
-            )
-
-        prefs, _created = SeekerPreferences.objects.get_or_create(user=user)
+        data = parse_json_body(request)
+        if not isinstance(data, dict):
+            return json_response({"detail": "Invalid JSON body"}, status=400)
 
-        prefs.required_services = [str(s).strip().lower() for s in required_services]
-        prefs.city = str(city).strip()
-        prefs.area = str(area).strip() if area else ""
-        prefs.from_time = from_t
-        prefs.to_time = to_t
-        prefs.frequency = str(frequency).strip().lower()
-        if available_for_work is not None:
-            prefs.available_for_work = bool(available_for_work)
+        defaults, detail = _clean_seeker_payload(data)
+        if detail:
+            return json_response({"detail": detail}, status=400)
 
-        prefs.save()
+        prefs, _created = SeekerPreferences.objects.update_or_create(user=user, defaults=defaults)
 
-        return JsonResponse(
-            {"seeker_preferences": _seeker_prefs_to_dict(prefs)},
+        return json_response(
+            {"seeker_preferences": seeker_prefs_to_dict(prefs)},
             status=200,
         )
 
-    return JsonResponse({"detail": "Method not allowed"}, status=405)
+    return method_not_allowed()